@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'output.request_id.RequestIdMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -61,10 +62,24 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.CachedJWTAuthentication',
     ),
 }
 
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'user.serializers.UserTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'user.serializers.UserTokenRefreshSerializer',
+}
+
+# Holds resolved users for JWT authentication. The default is per process;
+# point it at a shared backend (e.g. Redis) to share entries across workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+}
+
 
 ROOT_URLCONF = 'backend.urls'
 
@@ -100,6 +115,11 @@ DATABASES = {
         'PORT': os.getenv("DB_PORT"),
     }
 }
+# A DATABASE_URL such as sqlite:////tmp/bench.sqlite3 replaces the above
+if os.getenv("DATABASE_URL"):
+    import dj_database_url
+
+    DATABASES['default'] = dj_database_url.parse(os.getenv("DATABASE_URL"))
 
 
 # Password validation
@@ -142,3 +162,52 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Background search jobs
+
+SEARCH_JOB_WORKERS = int(os.getenv("SEARCH_JOB_WORKERS", "2"))
+SEARCH_JOB_MAX_PENDING = int(os.getenv("SEARCH_JOB_MAX_PENDING", "20"))
+# Running jobs without a heartbeat for this many seconds are requeued
+SEARCH_JOB_STALE_AFTER = int(os.getenv("SEARCH_JOB_STALE_AFTER", "900"))
+# Running jobs refresh their heartbeat this often, well within SEARCH_JOB_STALE_AFTER
+SEARCH_JOB_HEARTBEAT = int(os.getenv("SEARCH_JOB_HEARTBEAT", "60"))
+# Resume interrupted jobs as soon as the process starts. runserver always does;
+# set this only in the environment of server processes, never for commands
+SEARCH_JOB_RESUME_ON_START = os.getenv("SEARCH_JOB_RESUME_ON_START", "0") == "1"
+
+
+# Logging; every line carries the id of the request (or job) it belongs to
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'output.request_id.RequestIdFilter'},
+    },
+    'formatters': {
+        'standard': {
+            'format': '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'filters': ['request_id'],
+            'formatter': 'standard',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        'output': {
+            'handlers': ['console'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
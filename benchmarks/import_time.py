@@ -0,0 +1,104 @@
+"""Measure Django startup cost and check the LLM stack stays unimported.
+
+Times ``manage.py check`` and a simulated worker boot (load the WSGI app
+and resolve the output URLs) in fresh interpreters, and lists which heavy
+modules each one imported. Pass ``--baseline-rev`` to run the same
+measurements against another git revision in a temporary worktree::
+
+    python benchmarks/import_time.py --baseline-rev <rev>
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = [
+    "langchain",
+    "langchain_community",
+    "langchain_google_genai",
+    "google.generativeai",
+    "faiss",
+    "IPython",
+    "numpy",
+]
+
+WORKER_BOOT = """
+import json, sys
+from backend.wsgi import application
+from django.urls import resolve
+resolve('/output/search/')
+print(json.dumps(sorted(m for m in {heavy} if m in sys.modules)))
+""".format(heavy=HEAVY_MODULES)
+
+
+def run_timed(args, cwd, repeat):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="backend.settings")
+    timings = []
+    output = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            args, cwd=cwd, env=env, capture_output=True, text=True)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise SystemExit(f"{' '.join(args)} failed:\n{result.stderr}")
+        output = result.stdout
+    return statistics.median(timings), output
+
+
+def measure(cwd, repeat):
+    check_time, _ = run_timed(
+        [sys.executable, "manage.py", "check"], cwd, repeat)
+    boot_time, output = run_timed(
+        [sys.executable, "-c", WORKER_BOOT], cwd, repeat)
+    return {
+        "manage_py_check_s": round(check_time, 3),
+        "worker_boot_s": round(boot_time, 3),
+        "heavy_modules_at_boot": json.loads(output.strip().splitlines()[-1]),
+    }
+
+
+def measure_revision(rev, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = os.path.join(tmp, "baseline")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, rev],
+                       cwd=REPO_ROOT, check=True, capture_output=True)
+        try:
+            env_file = os.path.join(REPO_ROOT, "backend", ".env")
+            if os.path.exists(env_file):
+                with open(env_file, "rb") as src, \
+                        open(os.path.join(worktree, "backend", ".env"), "wb") as dst:
+                    dst.write(src.read())
+            return measure(worktree, repeat)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree],
+                           cwd=REPO_ROOT, capture_output=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline-rev")
+    args = parser.parse_args()
+
+    report = {"current": measure(REPO_ROOT, args.repeat)}
+    if args.baseline_rev:
+        report["baseline"] = measure_revision(args.baseline_rev, args.repeat)
+        for key in ("manage_py_check_s", "worker_boot_s"):
+            report[f"{key}_speedup"] = round(
+                report["baseline"][key] / report["current"][key], 2)
+    print(json.dumps(report, indent=2))
+
+    if report["current"]["heavy_modules_at_boot"]:
+        raise SystemExit(
+            "Worker boot imported: " + ", ".join(report["current"]["heavy_modules_at_boot"]))
+
+
+if __name__ == "__main__":
+    main()
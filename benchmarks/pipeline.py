@@ -0,0 +1,239 @@
+"""End-to-end search pipeline benchmark against local fakes.
+
+Serves fixture PDFs of several sizes from the local arXiv stub, runs
+``Scrapping`` (search, download, per-paper summaries and the overall
+summary) with the fake LLM and embedding backends, and reports per-stage
+wall time, peak RSS and LLM traffic. Each scenario runs in a fresh
+interpreter against a throwaway data directory: ``cold`` starts with empty
+caches and ``warm`` repeats the same search on top of them::
+
+    python benchmarks/pipeline.py --save-baseline   # record a baseline
+    python benchmarks/pipeline.py                   # fail on regressions
+
+LLM traffic is deterministic, so any increase over the committed baseline
+fails the run. Timings and memory depend on the machine and only warn,
+unless ``--strict`` is given on the machine that recorded the baseline.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baselines", "pipeline.json")
+QUERY = "retrieval augmented generation"
+SCENARIOS = ["cold", "warm"]
+STAGES = ["search", "download", "summarize", "overall"]
+# Deterministic for a given configuration, so any increase is a regression
+COUNT_METRICS = ("llm_calls", "llm_bytes_sent")
+# Timings below this many seconds are too noisy to compare relatively
+MIN_TIME_SLACK = 0.05
+
+
+def run_scenario(scenario):
+    """Run one search in this process and return its measurements"""
+    import django
+
+    django.setup()
+
+    from output.llm_gateway import get_gateway
+    from output.pdf_text import get_parse_pool
+    from output.scraper import Scrapping
+    from output.summary_cache import summary_cache
+
+    marks = []
+
+    def on_event(stage, **data):
+        if stage in STAGES and (not marks or marks[-1][0] != stage):
+            marks.append((stage, time.perf_counter()))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        outcome = Scrapping(QUERY, on_event=on_event)
+    end = time.perf_counter()
+    # Reap the parse workers so their peak RSS shows up in RUSAGE_CHILDREN
+    get_parse_pool().shutdown()
+
+    if not outcome:
+        raise SystemExit(f"{scenario}: the search returned no results")
+
+    stages = {}
+    for (stage, began), (_, ended) in zip(marks, marks[1:] + [(None, end)]):
+        stages[f"{stage}_s"] = round(ended - began, 3)
+
+    llm = get_gateway().snapshot()
+    # ru_maxrss is in kilobytes on Linux
+    return {
+        "scenario": scenario,
+        "wall_s": round(end - start, 3),
+        "stages": stages,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "workers_peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "llm_calls": llm["calls"],
+        "llm_retries": llm["retries"],
+        "llm_bytes_sent": llm["bytes_sent"],
+        "llm_bytes_received": llm["bytes_received"],
+        "papers": len(outcome["papers"]),
+        "summaries": len(outcome["summaries"]),
+        "summary_cache": summary_cache.stats(),
+    }
+
+
+def scenario_env(args, stub, data_dir):
+    return dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE="backend.settings",
+        # Paper metadata goes to a throwaway database, not the dev one
+        DATABASE_URL="sqlite:///" + os.path.join(data_dir, "bench.sqlite3"),
+        OUTPUT_DATA_DIR=data_dir,
+        ARXIV_API_URL=stub.api_url,
+        ARXIV_REQUEST_INTERVAL="0",
+        LLM_BACKEND="fake",
+        EMBEDDING_BACKEND="fake",
+        FAKE_LLM_LATENCY=str(args.llm_latency),
+        FAKE_EMBEDDING_LATENCY=str(args.embedding_latency),
+        LLM_RATE_PER_MINUTE=str(args.llm_rate),
+        LLM_BURST=str(max(1, int(args.llm_rate // 60))),
+    )
+
+
+def run_all(args):
+    from output.arxiv_stub import StubArxivServer
+
+    stub = StubArxivServer(latency=args.arxiv_latency)
+    # Results come back in id order, so each fixture size maps to one rank
+    stub.pdf_pages = {stub.arxiv_id(i): pages for i, pages in enumerate(args.pages)}
+    data_dir = tempfile.mkdtemp(prefix="researchit-bench-")
+    results = {}
+    try:
+        with stub:
+            env = scenario_env(args, stub, data_dir)
+            migrate = subprocess.run(
+                [sys.executable, "manage.py", "migrate", "--noinput"],
+                cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+            if migrate.returncode != 0:
+                raise SystemExit(f"migrate failed:\n{migrate.stderr}")
+            for scenario in SCENARIOS:
+                result = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--scenario", scenario],
+                    cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+                if result.returncode != 0:
+                    raise SystemExit(f"{scenario} scenario failed:\n{result.stderr}")
+                results[scenario] = json.loads(result.stdout.strip().splitlines()[-1])
+    finally:
+        if args.keep_data:
+            print(f"Benchmark data kept in {data_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def flatten(results):
+    metrics = {}
+    for scenario, result in results.items():
+        metrics[f"{scenario}.wall_s"] = result["wall_s"]
+        metrics[f"{scenario}.peak_rss_mb"] = result["peak_rss_mb"]
+        metrics[f"{scenario}.workers_peak_rss_mb"] = result["workers_peak_rss_mb"]
+        for key in COUNT_METRICS:
+            metrics[f"{scenario}.{key}"] = result[key]
+        for stage, seconds in result["stages"].items():
+            metrics[f"{scenario}.{stage}"] = seconds
+    return metrics
+
+
+def is_count(key):
+    return key.rsplit(".", 1)[-1] in COUNT_METRICS
+
+
+def find_regressions(current, baseline, tolerance):
+    regressions = []
+    for key, expected in baseline.items():
+        if key not in current:
+            continue
+        actual = current[key]
+        if is_count(key):
+            limit = expected
+        else:
+            limit = expected * (1 + tolerance)
+            if key.endswith("_s"):
+                limit = max(limit, expected + MIN_TIME_SLACK)
+        if actual > limit:
+            regressions.append((key, f"{key}: {actual} > {round(limit, 3)} (baseline {expected})"))
+    return regressions
+
+
+def config_of(args):
+    return {
+        "query": QUERY,
+        "pages": args.pages,
+        "llm_latency": args.llm_latency,
+        "embedding_latency": args.embedding_latency,
+        "arxiv_latency": args.arxiv_latency,
+        "llm_rate": args.llm_rate,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[2, 20, 80],
+                        help="page counts of the fixture PDFs, one per search result")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--embedding-latency", type=float, default=0.01)
+    parser.add_argument("--arxiv-latency", type=float, default=0.0)
+    parser.add_argument("--llm-rate", type=float, default=60000,
+                        help="LLM calls per minute; the default keeps throttling out of the numbers")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown before a timing counts as a regression")
+    parser.add_argument("--strict", action="store_true",
+                        help="fail on timing and memory regressions too, not just LLM traffic")
+    parser.add_argument("--keep-data", action="store_true")
+    parser.add_argument("--scenario", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        print(json.dumps(run_scenario(args.scenario)))
+        return
+
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        raise SystemExit(f"No baseline at {args.baseline}; record one with --save-baseline")
+
+    results = run_all(args)
+    report = {"config": config_of(args), "results": results}
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"config": report["config"], "metrics": flatten(results)}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["config"] != report["config"]:
+        raise SystemExit("Baseline was recorded with different settings; "
+                         "rerun with matching options or --save-baseline")
+    regressions = find_regressions(flatten(results), baseline["metrics"], args.tolerance)
+    fatal = [message for key, message in regressions if args.strict or is_count(key)]
+    warnings = [message for key, message in regressions if not (args.strict or is_count(key))]
+    if warnings:
+        print("Slower than the baseline machine:\n" + "\n".join(warnings), file=sys.stderr)
+    if fatal:
+        raise SystemExit("Regressions against baseline:\n" + "\n".join(fatal))
+
+
+if __name__ == "__main__":
+    main()
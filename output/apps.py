@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class OutputConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'output'
+
+    def ready(self):
+        from .jobs import should_resume_on_start, start_on_boot
+
+        if should_resume_on_start():
+            start_on_boot()
@@ -0,0 +1,252 @@
+import io
+import os
+import random
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from .metrics import arxiv_requests
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+OPENSEARCH = '{http://a9.com/-/spec/opensearch/1.1/}'
+
+ARXIV_API_URL = os.getenv("ARXIV_API_URL", "http://export.arxiv.org/api/query")
+# arXiv asks clients to leave three seconds between API calls
+ARXIV_REQUEST_INTERVAL = float(os.getenv("ARXIV_REQUEST_INTERVAL", "3"))
+ARXIV_PAGE_SIZE = int(os.getenv("ARXIV_PAGE_SIZE", "100"))
+ARXIV_ID_BATCH_SIZE = int(os.getenv("ARXIV_ID_BATCH_SIZE", "50"))
+ARXIV_MAX_RETRIES = int(os.getenv("ARXIV_MAX_RETRIES", "4"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# What a dropped or corrupted connection raises while a body is being read
+STREAM_ERRORS = (requests.RequestException, urllib3.exceptions.HTTPError, OSError)
+
+
+class ArxivError(Exception):
+    pass
+
+
+class RateLimiter:
+    """Keeps at least ``interval`` seconds between the start of any two calls"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next_allowed = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_allowed - now
+            self._next_allowed = max(now, self._next_allowed) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Shared by every client in the process so concurrent searches stay polite
+rate_limiter = RateLimiter(ARXIV_REQUEST_INTERVAL)
+
+
+def parse_entry(entry):
+    """Extract the metadata we keep for an Atom feed entry"""
+    title = entry.find(f'{ATOM}title').text
+    authors = [author.find(f'{ATOM}name').text
+               for author in entry.findall(f'{ATOM}author')]
+    summary = entry.find(f'{ATOM}summary').text
+    published = entry.find(f'{ATOM}published').text
+    entry_id = entry.find(f'{ATOM}id').text
+    pdf_url = entry_id.replace('abs', 'pdf') + ".pdf"
+    arxiv_id = entry_id.split('/')[-1]
+
+    return {
+        "arxiv_id": arxiv_id,
+        "title": title,
+        "authors": authors,
+        "published": published,
+        "summary": summary,
+        "pdf_url": pdf_url
+    }
+
+
+class ArxivClient:
+    def __init__(self, base_url=None, session=None, limiter=None,
+                 max_retries=None, timeout=15, conditional_cache_size=128):
+        self.base_url = base_url or ARXIV_API_URL
+        self.limiter = limiter or rate_limiter
+        self.max_retries = ARXIV_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        # Validators and bodies of recent responses, for conditional requests
+        self._conditional = OrderedDict()
+        self._conditional_size = conditional_cache_size
+        self._conditional_lock = threading.Lock()
+
+    def _conditional_get(self, key):
+        with self._conditional_lock:
+            cached = self._conditional.get(key)
+            if cached is not None:
+                self._conditional.move_to_end(key)
+            return cached
+
+    def _conditional_put(self, key, value):
+        with self._conditional_lock:
+            self._conditional[key] = value
+            self._conditional.move_to_end(key)
+            while len(self._conditional) > self._conditional_size:
+                self._conditional.popitem(last=False)
+
+    def _retry_delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return min(60.0, (2 ** attempt) * max(self.limiter.interval, 0.5)) * random.uniform(0.5, 1.5)
+
+    def _open_feed(self, params):
+        """Return a readable stream for the feed, retrying transient failures.
+
+        Responses carrying an ETag or Last-Modified are buffered so the next
+        identical request can be made conditional; all others are streamed
+        straight into the parser.
+        """
+        key = tuple(sorted(params.items()))
+        for attempt in range(self.max_retries + 1):
+            headers = {}
+            cached = self._conditional_get(key)
+            if cached:
+                if cached["etag"]:
+                    headers["If-None-Match"] = cached["etag"]
+                if cached["last_modified"]:
+                    headers["If-Modified-Since"] = cached["last_modified"]
+
+            self.limiter.wait()
+            try:
+                response = self.session.get(
+                    self.base_url, params=params, headers=headers,
+                    timeout=self.timeout, stream=True)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                arxiv_requests.inc(status="error")
+                if attempt == self.max_retries:
+                    raise ArxivError(f"arXiv request failed: {e}") from e
+                time.sleep(self._retry_delay(attempt))
+                continue
+
+            arxiv_requests.inc(status=response.status_code)
+            if response.status_code == 304 and cached:
+                response.close()
+                return io.BytesIO(cached["body"])
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                response.close()
+                time.sleep(self._retry_delay(attempt, response))
+                continue
+            if response.status_code != 200:
+                response.close()
+                raise ArxivError(f"arXiv returned HTTP {response.status_code}")
+
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                try:
+                    body = response.content
+                except STREAM_ERRORS as e:
+                    raise ArxivError(f"arXiv response was cut off: {e}") from e
+                self._conditional_put(key, {
+                    "etag": etag, "last_modified": last_modified, "body": body})
+                return io.BytesIO(body)
+
+            response.raw.decode_content = True
+            return response.raw
+
+    def _iter_feed(self, params, page_info):
+        """Incrementally parse one feed page, yielding entry metadata"""
+        feed = self._open_feed(params)
+        try:
+            for _, element in ET.iterparse(feed, events=("end",)):
+                if element.tag == f'{OPENSEARCH}totalResults':
+                    page_info["total"] = int(element.text or 0)
+                elif element.tag == f'{ATOM}entry':
+                    page_info["count"] += 1
+                    entry_id = element.findtext(f'{ATOM}id') or ''
+                    # arXiv reports query errors as a single pseudo entry
+                    if '/api/errors' in entry_id:
+                        raise ArxivError(element.findtext(f'{ATOM}summary') or entry_id)
+                    yield parse_entry(element)
+                    element.clear()
+        except ET.ParseError as e:
+            raise ArxivError(f"Malformed arXiv feed: {e}") from e
+        except STREAM_ERRORS as e:
+            raise ArxivError(f"arXiv response was cut off: {e}") from e
+        finally:
+            feed.close()
+
+    def iter_search(self, query, max_results=None, sort_by='relevance',
+                    sort_order='descending', page_size=None):
+        """Yield results for ``query`` page by page, up to ``max_results``"""
+        page_size = page_size or ARXIV_PAGE_SIZE
+        start = 0
+        yielded = 0
+        while max_results is None or yielded < max_results:
+            size = page_size if max_results is None else min(page_size, max_results - yielded)
+            params = {
+                "search_query": query,
+                "start": start,
+                "max_results": size,
+                "sortBy": sort_by,
+                "sortOrder": sort_order,
+            }
+            page_info = {"count": 0, "total": None}
+            for metadata in self._iter_feed(params, page_info):
+                yield metadata
+                yielded += 1
+                if max_results is not None and yielded >= max_results:
+                    return
+
+            start += page_info["count"]
+            if page_info["count"] < size:
+                return
+            if page_info["total"] is not None and start >= page_info["total"]:
+                return
+
+    def search(self, query, max_results=3, **kwargs):
+        return list(self.iter_search(query, max_results=max_results, **kwargs))
+
+    def fetch_by_ids(self, arxiv_ids, batch_size=None):
+        """Look up metadata for many ids with one ``id_list`` request per batch"""
+        batch_size = batch_size or ARXIV_ID_BATCH_SIZE
+        arxiv_ids = list(dict.fromkeys(arxiv_ids))
+        found = {}
+        for start in range(0, len(arxiv_ids), batch_size):
+            batch = arxiv_ids[start:start + batch_size]
+            params = {
+                "id_list": ",".join(batch),
+                "start": 0,
+                "max_results": len(batch),
+            }
+            for metadata in self._iter_feed(params, {"count": 0, "total": None}):
+                found[metadata["arxiv_id"]] = metadata
+                # Unversioned ids resolve to the latest version
+                found.setdefault(re.sub(r'v\d+$', '', metadata["arxiv_id"]), metadata)
+        return [found[arxiv_id] for arxiv_id in arxiv_ids if arxiv_id in found]
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ArxivClient()
+    return _client
@@ -0,0 +1,230 @@
+"""Local stand-in for the arXiv API, for offline throughput and politeness tests.
+
+Serves deterministic Atom feeds for any ``search_query`` or ``id_list`` and
+generated PDFs for every entry, records when each request arrived, and can
+inject latency and transient failures::
+
+    with StubArxivServer(total_results=250) as stub:
+        client = ArxivClient(base_url=stub.api_url, limiter=RateLimiter(0.1))
+        papers = client.search("llm databases", max_results=120)
+        assert stub.min_request_interval() >= 0.1
+
+Run ``python -m output.arxiv_stub --port 8765`` to point a dev server at it
+with ``ARXIV_API_URL=http://127.0.0.1:8765/api/query``.
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+
+def build_pdf(pages):
+    """Build a minimal valid PDF with one page per string in ``pages``"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for text in pages:
+        lines = []
+        for line in text.splitlines() or [""]:
+            line = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            lines.append(f"({line}) Tj T*")
+        stream = ("BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(lines) + " ET").encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def stub_paper_text(arxiv_id, pages, words_per_page=400):
+    """Deterministic pseudo-prose for a stub paper"""
+    vocabulary = [
+        "model", "database", "query", "latency", "throughput", "index", "retrieval",
+        "language", "evaluation", "benchmark", "results", "method", "dataset",
+        "training", "inference", "cache", "accuracy", "system", "analysis", "future",
+    ]
+    rng = random.Random(arxiv_id)
+    texts = []
+    for page in range(pages):
+        words = [rng.choice(vocabulary) for _ in range(words_per_page)]
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        texts.append(f"{arxiv_id} page {page + 1}\n" + "\n".join(lines))
+    return texts
+
+
+class StubArxivServer:
+    def __init__(self, host="127.0.0.1", port=0, total_results=250, latency=0.0,
+                 fail_first=0, pdf_pages=None, default_pdf_pages=3):
+        self.total_results = total_results
+        self.latency = latency
+        self.fail_first = fail_first
+        # arxiv_id -> page count, for fixtures of different sizes
+        self.pdf_pages = dict(pdf_pages or {})
+        self.default_pdf_pages = default_pdf_pages
+        self.request_log = []
+        self._lock = threading.Lock()
+        self._pdf_cache = {}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return f"{self.base_url}/api/query"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def min_request_interval(self, path_prefix="/api/query"):
+        """Smallest gap in seconds between consecutive API requests"""
+        times = [t for t, path in self.request_log if path.startswith(path_prefix)]
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        return min(gaps) if gaps else None
+
+    def arxiv_id(self, index):
+        return f"9901.{index:05d}v1"
+
+    def pdf_bytes(self, arxiv_id):
+        with self._lock:
+            if arxiv_id not in self._pdf_cache:
+                pages = self.pdf_pages.get(arxiv_id, self.default_pdf_pages)
+                self._pdf_cache[arxiv_id] = build_pdf(stub_paper_text(arxiv_id, pages))
+            return self._pdf_cache[arxiv_id]
+
+    def feed(self, query, id_list, start, max_results):
+        if id_list:
+            ids = id_list[start:start + max_results]
+            total = len(id_list)
+        else:
+            first = min(start, self.total_results)
+            last = min(start + max_results, self.total_results)
+            ids = [self.arxiv_id(i) for i in range(first, last)]
+            total = self.total_results
+
+        entries = []
+        for arxiv_id in ids:
+            entries.append(f"""  <entry>
+    <id>{self.base_url}/abs/{arxiv_id}</id>
+    <published>2024-01-01T00:00:00Z</published>
+    <title>Stub paper {escape(arxiv_id)} about {escape(query or 'ids')}</title>
+    <summary>Deterministic abstract for {escape(arxiv_id)}.</summary>
+    <author><name>Ada Stub</name></author>
+    <author><name>Alan Fixture</name></author>
+  </entry>""")
+        return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">
+  <title>arXiv stub query</title>
+  <opensearch:totalResults>{total}</opensearch:totalResults>
+  <opensearch:startIndex>{start}</opensearch:startIndex>
+  <opensearch:itemsPerPage>{max_results}</opensearch:itemsPerPage>
+{chr(10).join(entries)}
+</feed>
+""".encode("utf-8")
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                with server._lock:
+                    server.request_log.append((time.monotonic(), url.path))
+                    failing = server.fail_first > 0
+                    if failing:
+                        server.fail_first -= 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if failing:
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+
+                if url.path == "/api/query":
+                    self._feed(parse_qs(url.query))
+                elif url.path.startswith("/pdf/") and url.path.endswith(".pdf"):
+                    self._send(200, "application/pdf", server.pdf_bytes(url.path[5:-4]))
+                else:
+                    self._send(404, "text/plain", b"not found")
+
+            def _feed(self, params):
+                query = params.get("search_query", [""])[0]
+                id_list = [i for i in params.get("id_list", [""])[0].split(",") if i]
+                start = int(params.get("start", ["0"])[0])
+                max_results = int(params.get("max_results", ["10"])[0])
+                body = server.feed(query, id_list, start, max_results)
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self._send(200, "application/atom+xml", body, {"ETag": etag})
+
+            def _send(self, status, content_type, body, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--total", type=int, default=250)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubArxivServer(port=args.port, total_results=args.total, latency=args.latency)
+    print(f"arXiv stub listening on {stub.api_url}")
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        stub.httpd.server_close()
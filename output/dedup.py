@@ -0,0 +1,240 @@
+"""Near-duplicate detection for chunks and papers with MinHash and LSH.
+
+arXiv searches often return several versions of one paper, or papers
+that share most of their text. Chunks are compared on word shingles so
+that a chunk close enough to one embedded before reuses its vector, and
+whole papers are compared so that a near copy of a summarized paper
+reuses its summary.
+"""
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from .utils import cache_root, connect_sqlite
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+DEDUP_CHUNK_THRESHOLD = float(os.getenv("DEDUP_CHUNK_THRESHOLD", "0.9"))
+DEDUP_PAPER_THRESHOLD = float(os.getenv("DEDUP_PAPER_THRESHOLD", "0.85"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+DEDUP_MAX_CHUNKS = int(os.getenv("DEDUP_MAX_CHUNKS", "100000"))
+# How long a paper waits for a near copy being summarized by another thread
+DEDUP_WAIT_SECONDS = float(os.getenv("DEDUP_WAIT_SECONDS", "600"))
+
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_MAX_HASH = np.uint64(2 ** 32 - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 2 ** 32, size=DEDUP_NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 2 ** 32, size=DEDUP_NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text, size=None):
+    """Hashes of the overlapping word ``size``-grams of ``text``"""
+    size = size or DEDUP_SHINGLE_SIZE
+    words = text.lower().split()
+    if len(words) < size:
+        words = words + [""] * (size - len(words))
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+            for i in range(len(words) - size + 1)}
+
+
+def minhash(text, size=None):
+    """MinHash signature of ``text``'s shingles, one uint32 per permutation"""
+    return minhash_pages([text], size)
+
+
+def minhash_pages(pages, size=None):
+    """MinHash signature of a document streamed page by page"""
+    signature = np.full(DEDUP_NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    for page in pages:
+        hashes = np.fromiter(shingles(page, size), dtype=np.uint64)
+        # Blocks keep the shingles x permutations matrix small for long pages
+        for start in range(0, len(hashes), 4096):
+            block = hashes[start:start + 4096]
+            # a * x + b stays below 2**64 because a, b and x are all below 2**32
+            permuted = (np.outer(block, _PERM_A) + _PERM_B) % _PRIME
+            signature = np.minimum(signature, permuted.min(axis=0))
+    return np.minimum(signature, _MAX_HASH).astype(np.uint32)
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(signature == other))
+
+
+def lsh_params(threshold, num_perm):
+    """Bands and rows whose S-curve crosses 50% closest to ``threshold``"""
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        crossing = (1 / bands) ** (1 / rows)
+        if best is None or abs(crossing - threshold) < best[0]:
+            best = (abs(crossing - threshold), bands, rows)
+    return best[1], best[2]
+
+
+class NearDuplicateIndex:
+    """In-memory LSH index from keys to MinHash signatures.
+
+    ``query`` only returns keys whose estimated similarity reaches the
+    threshold, most similar first. With ``max_entries`` the oldest keys are
+    dropped once the index is full.
+    """
+
+    def __init__(self, threshold, num_perm=None, max_entries=None):
+        self.threshold = threshold
+        num_perm = num_perm or DEDUP_NUM_PERM
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.max_entries = max_entries
+        self._signatures = OrderedDict()
+        self._buckets = [{} for _ in range(self.bands)]
+        self._lock = threading.Lock()
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature):
+        with self._lock:
+            if key in self._signatures:
+                self._remove(key)
+            self._signatures[key] = signature
+            for band, band_key in self._band_keys(signature):
+                self._buckets[band].setdefault(band_key, set()).add(key)
+            while self.max_entries and len(self._signatures) > self.max_entries:
+                self._remove(next(iter(self._signatures)))
+
+    def _remove(self, key):
+        signature = self._signatures.pop(key)
+        for band, band_key in self._band_keys(signature):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def remove(self, key):
+        with self._lock:
+            if key in self._signatures:
+                self._remove(key)
+
+    def query(self, signature):
+        with self._lock:
+            candidates = set()
+            for band, band_key in self._band_keys(signature):
+                candidates |= self._buckets[band].get(band_key, set())
+            matches = []
+            for key in candidates:
+                score = similarity(signature, self._signatures[key])
+                if score >= self.threshold:
+                    matches.append((score, key))
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return matches
+
+    def __len__(self):
+        with self._lock:
+            return len(self._signatures)
+
+
+_chunk_indexes = {}
+_chunk_indexes_lock = threading.Lock()
+
+
+def get_chunk_index(model_name):
+    """Process-wide index of embedded chunks; one per model so vectors never mix"""
+    with _chunk_indexes_lock:
+        if model_name not in _chunk_indexes:
+            _chunk_indexes[model_name] = NearDuplicateIndex(
+                DEDUP_CHUNK_THRESHOLD, max_entries=DEDUP_MAX_CHUNKS)
+        return _chunk_indexes[model_name]
+
+
+class PaperIndex:
+    """Signatures of summarized papers, persisted so near copies are found across runs.
+
+    A paper being summarized is ``claim``-ed first: later near copies see
+    the claim and ``wait`` for it instead of summarizing the same text
+    again. The claim is ``complete``-d once its summary is cached, or
+    ``release``-d if summarizing failed.
+    """
+
+    def __init__(self, db_path=None, threshold=None):
+        self.db_path = db_path or os.path.join(cache_root, 'paper_signatures.sqlite3')
+        self.threshold = DEDUP_PAPER_THRESHOLD if threshold is None else threshold
+        self._index = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {"papers": 0, "reused": 0}
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect_sqlite(self.db_path)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS paper_signatures ('
+                'arxiv_id TEXT NOT NULL, content_hash TEXT NOT NULL, '
+                'signature BLOB NOT NULL, PRIMARY KEY (arxiv_id, content_hash))'
+            )
+            self._local.conn = conn
+        return conn
+
+    def _get_index(self):
+        # Called with self._lock held
+        if self._index is None:
+            self._index = NearDuplicateIndex(self.threshold)
+            for arxiv_id, content_hash, blob in self.conn.execute(
+                    'SELECT arxiv_id, content_hash, signature FROM paper_signatures'):
+                signature = np.frombuffer(blob, dtype=np.uint32)
+                if signature.shape[0] == DEDUP_NUM_PERM:
+                    self._index.add((arxiv_id, content_hash), signature)
+        return self._index
+
+    def claim(self, arxiv_id, content_hash, signature):
+        """Return the key of a near copy of this paper, or claim the paper and return None"""
+        key = (arxiv_id, content_hash)
+        with self._lock:
+            index = self._get_index()
+            self.stats["papers"] += 1
+            for _, match in index.query(signature):
+                if match != key:
+                    return match
+            index.add(key, signature)
+            self._pending[key] = threading.Event()
+            return None
+
+    def wait(self, key, timeout=None):
+        with self._lock:
+            event = self._pending.get(key)
+        if event is not None:
+            event.wait(DEDUP_WAIT_SECONDS if timeout is None else timeout)
+
+    def complete(self, arxiv_id, content_hash, signature):
+        key = (arxiv_id, content_hash)
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO paper_signatures (arxiv_id, content_hash, signature) '
+                'VALUES (?, ?, ?)', (arxiv_id, content_hash, signature.tobytes()))
+        with self._lock:
+            event = self._pending.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def release(self, arxiv_id, content_hash):
+        key = (arxiv_id, content_hash)
+        with self._lock:
+            self._get_index().remove(key)
+            event = self._pending.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def record_reuse(self):
+        with self._lock:
+            self.stats["reused"] += 1
+
+
+paper_index = PaperIndex()
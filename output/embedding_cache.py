@@ -0,0 +1,221 @@
+import math
+import os
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .dedup import DEDUP_ENABLED, get_chunk_index, minhash
+from .metrics import record_cache, stage_duration
+from .utils import cache_root, connect_sqlite, sha256_text
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+FAKE_EMBEDDING_LATENCY = float(os.getenv("FAKE_EMBEDDING_LATENCY", "0"))
+
+
+def normalize_chunk(text):
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """float32 chunk embeddings stored as SQLite blobs, keyed by chunk text and model"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(cache_root, 'embeddings.sqlite3')
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect_sqlite(self.db_path)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS embeddings ('
+                'key TEXT PRIMARY KEY, model TEXT NOT NULL, '
+                'dim INTEGER NOT NULL, vector BLOB NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def make_key(self, text, model_name):
+        return sha256_text(model_name, normalize_chunk(text))
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f'SELECT key, vector FROM embeddings WHERE key IN ({placeholders})', batch)
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model_name, items):
+        rows = []
+        for key, vector in items:
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((key, model_name, vector.shape[0], vector.tobytes()))
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO embeddings (key, model, dim, vector) '
+                'VALUES (?, ?, ?, ?)', rows)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the backend, in batches"""
+
+    def __init__(self, embeddings, model_name, cache=None, batch_size=None,
+                 near_duplicates=None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache if cache is not None else embedding_cache
+        self.batch_size = batch_size or EMBEDDING_BATCH_SIZE
+        if near_duplicates is None and DEDUP_ENABLED:
+            near_duplicates = get_chunk_index(model_name)
+        self.near_duplicates = near_duplicates
+        self._lock = threading.Lock()
+        self.stats = {
+            "texts": 0,
+            "hits": 0,
+            "near_duplicates": 0,
+            "embedded": 0,
+            "backend_calls": 0,
+            "calls_saved": 0,
+            "bytes_saved": 0,
+        }
+
+    def _embed(self, items, vectors):
+        """Embed ``(key, text)`` pairs in batches into ``vectors``; returns the call count"""
+        calls = 0
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            batch_start = time.perf_counter()
+            embedded = self.embeddings.embed_documents([text for _, text in batch])
+            stage_duration.observe(time.perf_counter() - batch_start, stage="embedding_batch")
+            calls += 1
+            new_items = [(key, vector) for (key, _), vector in zip(batch, embedded)]
+            self.cache.put_many(self.model_name, new_items)
+            for key, vector in new_items:
+                vectors[key] = np.asarray(vector, dtype=np.float32)
+        return calls
+
+    def _split_near_duplicates(self, missing):
+        """Pop chunks close to one already indexed out of ``missing``.
+
+        Returns the near duplicates, mapped to the key whose vector they
+        borrow, and the keys newly added to the index.
+        """
+        aliases = {}
+        added = []
+        for key, text in list(missing.items()):
+            signature = minhash(text)
+            matches = self.near_duplicates.query(signature)
+            if matches:
+                aliases[key] = matches[0][1]
+                del missing[key]
+            else:
+                # Later chunks, in this request or another, may borrow this one
+                self.near_duplicates.add(key, signature)
+                added.append(key)
+        return aliases, added
+
+    def embed_documents(self, texts):
+        keys = [self.cache.make_key(text, self.model_name) for text in texts]
+        vectors = self.cache.get_many(set(keys))
+
+        # Identical chunks within one request are only embedded once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        aliases, added = {}, []
+        if self.near_duplicates is not None:
+            aliases, added = self._split_near_duplicates(missing)
+
+        missing_items = list(missing.items())
+        try:
+            calls = self._embed(missing_items, vectors)
+        except BaseException:
+            for key in added:
+                self.near_duplicates.remove(key)
+            raise
+
+        reused = []
+        if aliases:
+            vectors.update(self.cache.get_many(
+                {source for source in aliases.values() if source not in vectors}))
+            texts_by_key = dict(zip(keys, texts))
+            orphans = []
+            for key, source in aliases.items():
+                if source in vectors:
+                    # Borrowed vectors stay out of the cache, which is keyed by
+                    # exact content and would keep serving them under any
+                    # dedup setting
+                    vectors[key] = vectors[source]
+                    reused.append(key)
+                else:
+                    # The borrowed chunk is still being embedded elsewhere
+                    orphans.append((key, texts_by_key[key]))
+            calls += self._embed(orphans, vectors)
+            missing_items += orphans
+
+        embedded_keys = {key for key, _ in missing_items}
+        hits = len(texts) - len(missing_items) - len(reused)
+        record_cache("embedding", True, hits)
+        record_cache("embedding", False, len(missing_items))
+        record_cache("near_duplicate_chunk", True, len(reused))
+        with self._lock:
+            self.stats["texts"] += len(texts)
+            self.stats["hits"] += hits
+            self.stats["near_duplicates"] += len(reused)
+            self.stats["embedded"] += len(missing_items)
+            self.stats["backend_calls"] += calls
+            self.stats["calls_saved"] += math.ceil(len(texts) / self.batch_size) - calls
+            self.stats["bytes_saved"] += sum(
+                len(text.encode('utf-8')) for key, text in zip(keys, texts)
+                if key not in embedded_keys)
+
+        return [vectors[key].tolist() for key in keys]
+
+    def embed_query(self, text):
+        # Backends may embed queries differently from documents, so they
+        # are cached under their own key
+        key = self.cache.make_key(text, self.model_name + "#query")
+        cached = self.cache.get_many([key]).get(key)
+        record_cache("embedding_query", cached is not None)
+        if cached is not None:
+            return cached.tolist()
+        vector = self.embeddings.embed_query(text)
+        self.cache.put_many(self.model_name, [(key, vector)])
+        return vector
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic offline embeddings: unit vectors seeded by the text hash"""
+
+    def __init__(self, dim=768, latency=None):
+        self.dim = dim
+        self.latency = FAKE_EMBEDDING_LATENCY if latency is None else latency
+        self.calls = 0
+
+    def _vector(self, text):
+        seed = int(sha256_text(normalize_chunk(text))[:16], 16)
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,59 @@
+"""A user's past searches, newest first, paged by keyset cursors.
+
+A cursor names the last run of the previous page by ``(created_at, id)``,
+so every page is one range scan of the ``(user, created_at, id)`` index no
+matter how far back it is, unlike an offset that has to skip all earlier
+rows.
+"""
+import base64
+import binascii
+import os
+from datetime import datetime
+
+from django.db.models import Q
+
+from .models import SearchRun
+
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "100"))
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(run):
+    raw = f"{run.created_at.isoformat()}|{run.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, run_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(run_id)
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def history_page(user, cursor=None, limit=None):
+    """One page of ``user``'s runs and the cursor of the next page, or None"""
+    limit = min(limit or HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE)
+    runs = SearchRun.objects.filter(user=user)
+    if cursor:
+        created_at, run_id = decode_cursor(cursor)
+        runs = runs.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=run_id))
+    # One extra row tells whether there is another page
+    runs = list(runs.order_by('-created_at', '-id')
+                .only('id', 'query', 'created_at')[:limit + 1])
+    next_cursor = encode_cursor(runs[limit - 1]) if len(runs) > limit else None
+    return runs[:limit], next_cursor
+
+
+def serialize_history_entry(run):
+    return {
+        "run_id": run.id,
+        "query": run.query,
+        "created_at": run.created_at,
+    }
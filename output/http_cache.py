@@ -0,0 +1,88 @@
+"""Conditional, precompressed responses for stored search results.
+
+Runs and finished jobs are serialized and compressed once when they are
+saved (``results.store_payload``). Views send those bytes as they are, with a
+strong ETag per content coding, and answer a matching ``If-None-Match``
+with ``304 Not Modified`` after reading only the hash.
+"""
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.http import HttpResponse, HttpResponseNotModified
+
+from .results import store_payload
+
+# Preferred first; identity is the fallback
+PAYLOAD_ENCODINGS = (("br", "payload_br"), ("gzip", "payload_gzip"))
+
+
+def accepted_encodings(request):
+    """Content codings the client accepts, leaving out any refused with q=0"""
+    accepted = set()
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        name, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.lower())
+    return accepted
+
+
+def make_etag(payload_hash, encoding=None):
+    return f'"{payload_hash}-{encoding}"' if encoding else f'"{payload_hash}"'
+
+
+def etag_matches(request, payload_hash):
+    """Whether ``If-None-Match`` names any encoding of this payload"""
+    header = request.headers.get("If-None-Match", "")
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        # If-None-Match uses weak comparison, so a W/ prefix does not matter
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if tag.split("-", 1)[0] == payload_hash:
+            return True
+    return False
+
+
+def payload_response(request, queryset, serialize):
+    """The stored payload of the one row in ``queryset``, or None if there is none.
+
+    Rows stored before payloads existed are serialized with ``serialize``
+    and stored on first use.
+    """
+    row = queryset.annotate(has_br=ExpressionWrapper(
+        Q(payload_br__isnull=False), output_field=BooleanField())
+    ).only("payload_hash").first()
+    if row is None:
+        return None
+    has_br = row.has_br
+    if not row.payload_hash:
+        row = queryset.get()
+        store_payload(row, serialize(row))
+        has_br = row.payload_br is not None
+
+    accepted = accepted_encodings(request)
+    encoding, field = None, "payload"
+    for name, column in PAYLOAD_ENCODINGS:
+        if name in accepted and (name != "br" or has_br):
+            encoding, field = name, column
+            break
+
+    if etag_matches(request, row.payload_hash):
+        response = HttpResponseNotModified()
+    else:
+        body = queryset.values_list(field, flat=True).get()
+        response = HttpResponse(bytes(body), content_type="application/json")
+        if encoding:
+            response["Content-Encoding"] = encoding
+        response["Content-Length"] = str(len(response.content))
+    response["ETag"] = make_etag(row.payload_hash, encoding)
+    response["Vary"] = "Accept-Encoding"
+    # Possibly per user, and cheap to revalidate
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,237 @@
+import logging
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .metrics import search_jobs_queued, timed
+from .models import SearchJob
+from .request_id import get_request_id, in_current_context, request_id_var
+from .results import load_payload, save_search_run, store_payload
+
+logger = logging.getLogger(__name__)
+
+# Events that describe how far a job got; everything else is result data
+PROGRESS_STAGES = ("search", "download", "summarize", "overall")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def get_executor():
+    """Return the process-wide worker pool, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.SEARCH_JOB_WORKERS,
+                thread_name_prefix='search-job'
+            )
+            resume_interrupted_jobs(_executor)
+    return _executor
+
+
+def _forget_executor():
+    # A forked child (e.g. a gunicorn --preload worker) inherits the pool
+    # object but none of its threads
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_executor)
+
+
+def should_resume_on_start(argv=None):
+    """Whether to resume jobs at startup: opted in, or serving with runserver.
+
+    Commands, tests and scripts calling ``django.setup()`` must not start
+    the pool, since its workers are joined, running whole searches, at exit.
+    """
+    if settings.SEARCH_JOB_RESUME_ON_START:
+        return True
+    argv = sys.argv if argv is None else argv
+    if os.path.basename(argv[0]) != 'manage.py' or argv[1:2] != ['runserver']:
+        return False
+    # With the autoreloader only its child process serves requests
+    return '--noreload' in argv or os.environ.get('RUN_MAIN') == 'true'
+
+
+def start_on_boot():
+    """Start the worker pool, which resumes interrupted jobs, without blocking startup.
+
+    Servers that fork workers after loading the app can call this from their
+    worker hook instead, e.g. gunicorn's ``post_fork``.
+    """
+    def start():
+        try:
+            get_executor()
+        except DatabaseError:
+            logger.exception("Could not resume interrupted search jobs")
+        finally:
+            connection.close()
+
+    threading.Thread(target=start, name='search-job-resume', daemon=True).start()
+
+
+def resume_interrupted_jobs(executor):
+    """Requeue jobs left pending, or running without a heartbeat, by a previous worker"""
+    stale_before = timezone.now() - timedelta(seconds=settings.SEARCH_JOB_STALE_AFTER)
+    SearchJob.objects.filter(
+        status=SearchJob.STATUS_RUNNING, updated_at__lt=stale_before
+    ).update(status=SearchJob.STATUS_PENDING, updated_at=timezone.now())
+
+    for job_id in SearchJob.objects.filter(
+            status=SearchJob.STATUS_PENDING).values_list('id', flat=True):
+        search_jobs_queued.inc()
+        executor.submit(run_search_job, job_id)
+
+
+def submit_search_job(query, listener=None, user=None):
+    """Queue a search; ``listener(stage, data)`` receives every pipeline event.
+
+    The run is saved to ``user``'s history when one is given.
+    """
+    pending = SearchJob.objects.filter(
+        status__in=[SearchJob.STATUS_PENDING, SearchJob.STATUS_RUNNING]).count()
+    if pending >= settings.SEARCH_JOB_MAX_PENDING:
+        raise JobQueueFull(f"{pending} search jobs are already queued")
+
+    executor = get_executor()
+    job = SearchJob.objects.create(query=query, user=user)
+    search_jobs_queued.inc()
+    # The job logs under the id of the request that submitted it
+    executor.submit(in_current_context(run_search_job), job.id, listener)
+    logger.info("Queued search job %s for %r", job.id, query)
+    return job
+
+
+def touch_job(job_id, lease):
+    """Refresh a running job's heartbeat; False once another worker holds it"""
+    return bool(SearchJob.objects.filter(
+        id=job_id, lease=lease, status=SearchJob.STATUS_RUNNING
+    ).update(updated_at=timezone.now()))
+
+
+def keep_alive(job_id, lease, stop):
+    """Beat until ``stop`` is set, so long stages are never taken for stale"""
+    try:
+        while not stop.wait(settings.SEARCH_JOB_HEARTBEAT):
+            if not touch_job(job_id, lease):
+                return
+    except DatabaseError:
+        logger.exception("Heartbeat for search job %s failed", job_id)
+    finally:
+        connection.close()
+
+
+def run_search_job(job_id, listener=None):
+    from .scraper import Scrapping
+
+    token = None
+    if get_request_id() == "-":
+        # Resumed jobs have no request; log under the job id instead
+        token = request_id_var.set(f"job-{job_id}")
+    close_old_connections()
+    lease = uuid.uuid4().hex
+    stop = threading.Event()
+    try:
+        # Claim the job atomically so that only one worker process runs it
+        claimed = SearchJob.objects.filter(
+            id=job_id, status=SearchJob.STATUS_PENDING
+        ).update(
+            status=SearchJob.STATUS_RUNNING,
+            lease=lease,
+            attempts=F('attempts') + 1,
+            started_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        if not claimed:
+            if listener:
+                listener("error", {"job_id": str(job_id),
+                                   "error": "Job is already being run by another worker"})
+            return
+
+        threading.Thread(
+            target=in_current_context(keep_alive), args=(job_id, lease, stop),
+            name=f'search-job-heartbeat-{job_id}', daemon=True).start()
+        job = SearchJob.objects.get(id=job_id)
+        owned = SearchJob.objects.filter(id=job_id, lease=lease)
+
+        def on_event(stage, **data):
+            if listener:
+                listener(stage, data)
+            if stage in PROGRESS_STAGES:
+                job.stage = stage
+                job.progress[stage] = data
+                owned.update(stage=stage, progress=job.progress, updated_at=timezone.now())
+
+        with timed("search_job"):
+            outcome = Scrapping(job.query, on_event=on_event)
+
+        with transaction.atomic():
+            # Requeued as stale and claimed again elsewhere: that run wins
+            still_owned = owned.filter(
+                status=SearchJob.STATUS_RUNNING).select_for_update().only('id').first()
+            if still_owned is None:
+                logger.warning("Search job %s was taken over by another worker; "
+                               "dropping this result", job_id)
+                if listener:
+                    listener("error", {"job_id": str(job_id),
+                                       "error": "Job was taken over by another worker"})
+                return
+            job.run = save_search_run(job.query, outcome, user_id=job.user_id)
+            job.status = SearchJob.STATUS_SUCCEEDED
+            job.stage = "done"
+            job.finished_at = timezone.now()
+            job.save()
+            # A finished job no longer changes, so its response is stored once
+            store_payload(job, serialize_job(job))
+        logger.info("Search job %s succeeded", job.id)
+        if listener:
+            listener("done", {"job_id": str(job.id), "run_id": job.run_id})
+    except Exception as e:
+        logger.exception("Search job %s failed", job_id)
+        SearchJob.objects.filter(id=job_id, lease=lease).update(
+            status=SearchJob.STATUS_FAILED,
+            error=str(e),
+            finished_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        if listener:
+            listener("error", {"job_id": str(job_id), "error": str(e)})
+    finally:
+        stop.set()
+        search_jobs_queued.dec()
+        close_old_connections()
+        if token is not None:
+            request_id_var.reset(token)
+
+
+def serialize_job(job):
+    data = {
+        "job_id": str(job.id),
+        "query": job.query,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == SearchJob.STATUS_SUCCEEDED and job.run_id:
+        data["result"] = load_payload(job.run)
+    if job.status == SearchJob.STATUS_FAILED:
+        data["error"] = job.error
+    return data
@@ -0,0 +1,251 @@
+"""Single entry point for text generation.
+
+Every LLM call in the pipeline goes through ``LLMGateway.generate``. The
+gateway enforces a process-wide cap on in-flight calls, a token-bucket
+rate limit, per-call timeouts and jittered retries on transient errors,
+and delegates the call itself to a backend: Gemini, or a deterministic
+offline fake for load tests (``LLM_BACKEND=fake``).
+"""
+import hashlib
+import os
+import queue
+import random
+import threading
+import time
+
+from .metrics import llm_bytes, llm_calls, stage_duration
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", "60"))
+LLM_BURST = int(os.getenv("LLM_BURST", "10"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0"))
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMTimeout(LLMError):
+    pass
+
+
+class TransientLLMError(LLMError):
+    """Raised by backends for failures worth retrying"""
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second, capacity):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeminiBackend:
+    name = "gemini"
+
+    @property
+    def model_key(self):
+        from .providers import TEXT_MODEL_NAME
+
+        return TEXT_MODEL_NAME
+
+    def __init__(self, pool_size):
+        # Model handles are handed out one per in-flight call
+        self._clients = queue.LifoQueue()
+        self._pool_size = pool_size
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_client(self):
+        import google.generativeai as genai
+
+        from .providers import TEXT_MODEL_NAME, get_text_model
+
+        get_text_model()  # configures the API key once per process
+        return genai.GenerativeModel(model_name=TEXT_MODEL_NAME)
+
+    def _acquire_client(self):
+        try:
+            return self._clients.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self._pool_size
+            if create:
+                self._created += 1
+        if create:
+            return self._new_client()
+        return self._clients.get()
+
+    def generate(self, prompt, timeout):
+        from google.api_core import exceptions as google_exceptions
+
+        client = self._acquire_client()
+        try:
+            response = client.generate_content(
+                prompt, request_options={"timeout": timeout})
+            return response.text
+        except google_exceptions.DeadlineExceeded as e:
+            raise LLMTimeout(str(e)) from e
+        except (google_exceptions.ResourceExhausted,
+                google_exceptions.ServiceUnavailable,
+                google_exceptions.InternalServerError) as e:
+            raise TransientLLMError(str(e)) from e
+        finally:
+            self._clients.put(client)
+
+
+class FakeBackend:
+    """Deterministic offline backend: the same prompt always gets the same text.
+
+    Structured-summary prompts get all four numbered sections, long enough
+    to skip the repair pass, so the whole pipeline can run without network.
+    """
+    name = "fake"
+
+    @property
+    def model_key(self):
+        # Like fake embeddings, fake text never shares cache keys with the real model's
+        from .providers import TEXT_MODEL_NAME
+
+        return "fake/" + TEXT_MODEL_NAME
+
+    SECTIONS = ["OVERVIEW", "KEY FINDINGS", "METHODOLOGIES", "RECOMMENDATIONS"]
+    WORDS = [
+        "the", "model", "results", "show", "data", "method", "improves", "latency",
+        "retrieval", "database", "evaluation", "significant", "approach", "system",
+        "analysis", "future", "work", "propose", "benchmark", "accuracy",
+    ]
+
+    def __init__(self, latency=None, words=120):
+        self.latency = FAKE_LLM_LATENCY if latency is None else latency
+        self.words = words
+
+    def _paragraph(self, rng):
+        return " ".join(rng.choice(self.WORDS) for _ in range(self.words))
+
+    def generate(self, prompt, timeout):
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise LLMTimeout(f"fake backend latency {self.latency}s exceeds {timeout}s")
+        if self.latency:
+            time.sleep(self.latency)
+
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        if "EXACT sections" in prompt:
+            return "\n\n".join(
+                f"{number}. **{section}** - {self._paragraph(rng)}"
+                for number, section in enumerate(self.SECTIONS, start=1))
+        return self._paragraph(rng)
+
+
+class LLMGateway:
+    def __init__(self, backend, max_in_flight=None, rate_per_minute=None,
+                 burst=None, timeout=None, max_retries=None):
+        self.backend = backend
+        max_in_flight = max_in_flight or LLM_MAX_IN_FLIGHT
+        self._in_flight_slots = threading.BoundedSemaphore(max_in_flight)
+        rate_per_minute = rate_per_minute or LLM_RATE_PER_MINUTE
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst or LLM_BURST)
+        self.timeout = timeout or LLM_TIMEOUT
+        self.max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "retries": 0,
+            "failures": 0,
+            "in_flight": 0,
+            "bytes_sent": 0,
+            "bytes_received": 0,
+            "seconds": 0.0,
+        }
+
+    @property
+    def model_key(self):
+        """Names the backend's model in the keys of caches of its output"""
+        return self.backend.model_key
+
+    def _add(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def generate(self, prompt):
+        """Return the model's text for ``prompt``, raising LLMError on failure"""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self._in_flight_slots:
+                sent = len(prompt.encode("utf-8"))
+                self._add(calls=1, in_flight=1, bytes_sent=sent)
+                llm_bytes.inc(sent, direction="sent")
+                start = time.monotonic()
+                try:
+                    text = self.backend.generate(prompt, self.timeout)
+                except LLMTimeout as e:
+                    llm_calls.inc(backend=self.backend.name, outcome="timeout")
+                    error = e
+                except TransientLLMError as e:
+                    llm_calls.inc(backend=self.backend.name, outcome="transient_error")
+                    error = e
+                except Exception as e:
+                    llm_calls.inc(backend=self.backend.name, outcome="error")
+                    self._add(failures=1)
+                    raise LLMError(f"{self.backend.name} call failed: {e}") from e
+                else:
+                    received = len(text.encode("utf-8"))
+                    llm_calls.inc(backend=self.backend.name, outcome="ok")
+                    llm_bytes.inc(received, direction="received")
+                    self._add(bytes_received=received)
+                    return text
+                finally:
+                    elapsed = time.monotonic() - start
+                    stage_duration.observe(elapsed, stage="llm_call")
+                    self._add(in_flight=-1, seconds=elapsed)
+
+            if attempt == self.max_retries:
+                self._add(failures=1)
+                raise error
+            self._add(retries=1)
+            time.sleep(min(30.0, 2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+def create_backend(name=None):
+    name = name or LLM_BACKEND
+    if name == "gemini":
+        return GeminiBackend(pool_size=LLM_MAX_IN_FLIGHT)
+    if name == "fake":
+        return FakeBackend()
+    raise ValueError(f"Unknown LLM backend {name!r}")
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway(create_backend())
+    return _gateway
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from output.summary_cache import summary_cache
+
+
+class Command(BaseCommand):
+    help = "Remove cached per-paper summaries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--arxiv-id', help="Only clear this paper")
+        parser.add_argument(
+            '--stale-only', action='store_true',
+            help="Only clear summaries produced by an outdated prompt")
+
+    def handle(self, *args, **options):
+        keep_prompt_hash = None
+        if options['stale_only']:
+            from output.research_model import SUMMARY_PROMPT_HASH
+            keep_prompt_hash = SUMMARY_PROMPT_HASH
+
+        removed = summary_cache.invalidate(
+            arxiv_id=options['arxiv_id'], keep_prompt_hash=keep_prompt_hash)
+        self.stdout.write(f"Removed {removed} cached summaries")
@@ -0,0 +1,35 @@
+"""Paper metadata lookups backed by the ``Paper`` table.
+
+Metadata is upserted as soon as arXiv returns it, so reads by arXiv id go
+through the unique index, reads by search run through the run's summary
+rows, and reads by recency through the ``updated_at`` index. None of them
+depend on how many papers have been downloaded.
+"""
+from .models import Paper, Summary
+from .results import serialize_paper, upsert_paper
+
+
+def save_metadata(metadata):
+    return upsert_paper(metadata)
+
+
+def get_metadata(arxiv_id):
+    paper = Paper.objects.filter(arxiv_id=arxiv_id).first()
+    return serialize_paper(paper) if paper else None
+
+
+def get_metadata_many(arxiv_ids):
+    """Metadata by arXiv id for every id that is known, in one query"""
+    papers = Paper.objects.in_bulk(list(arxiv_ids), field_name='arxiv_id')
+    return {arxiv_id: serialize_paper(paper) for arxiv_id, paper in papers.items()}
+
+
+def recent_metadata(limit=5):
+    return [serialize_paper(paper)
+            for paper in Paper.objects.order_by('-updated_at')[:limit]]
+
+
+def run_metadata(run_id):
+    summaries = (Summary.objects.filter(run_id=run_id)
+                 .select_related('paper').order_by('position'))
+    return [serialize_paper(summary.paper) for summary in summaries]
@@ -0,0 +1,196 @@
+"""In-process pipeline metrics rendered in the Prometheus text format.
+
+Each server process keeps its own registry; scrape every worker (or run a
+single one) to see the whole picture. Work done inside the PDF parse pool
+is timed by the thread waiting for it, since those processes have no
+registry of their own.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        # Called at scrape time for gauges owned by another component
+        self.function = function
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.function is not None:
+            return [(self.name, (), (), self.function())]
+        return super().samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {
+                    "counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            state["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), state["counts"]):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key,
+                                    (("le", _format_value(float(bound))),), cumulative))
+                samples.append((f"{self.name}_sum", key, (), state["sum"]))
+                samples.append((f"{self.name}_count", key, (), state["count"]))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+def _gateway_in_flight():
+    from . import llm_gateway
+
+    # Reading the gauge must not create the gateway
+    gateway = llm_gateway._gateway
+    return gateway.snapshot()["in_flight"] if gateway is not None else 0
+
+
+registry = Registry()
+
+stage_duration = registry.register(Histogram(
+    "researchit_stage_duration_seconds",
+    "Wall time of each pipeline stage",
+    ["stage"]))
+stage_failures = registry.register(Counter(
+    "researchit_stage_failures_total",
+    "Pipeline stage runs that raised",
+    ["stage"]))
+arxiv_requests = registry.register(Counter(
+    "researchit_arxiv_requests_total",
+    "HTTP requests made to the arXiv API, by response status",
+    ["status"]))
+pdf_download_bytes = registry.register(Counter(
+    "researchit_pdf_download_bytes_total",
+    "Bytes of PDF downloaded from arXiv"))
+llm_calls = registry.register(Counter(
+    "researchit_llm_calls_total",
+    "LLM backend calls, by outcome",
+    ["backend", "outcome"]))
+llm_bytes = registry.register(Counter(
+    "researchit_llm_bytes_total",
+    "Prompt and response bytes exchanged with the LLM backend",
+    ["direction"]))
+cache_requests = registry.register(Counter(
+    "researchit_cache_requests_total",
+    "Cache lookups, by cache and result",
+    ["cache", "result"]))
+search_jobs_queued = registry.register(Gauge(
+    "researchit_search_jobs_queued",
+    "Search jobs submitted to this process that have not finished"))
+llm_in_flight = registry.register(Gauge(
+    "researchit_llm_in_flight",
+    "LLM calls currently waiting on the backend",
+    function=_gateway_in_flight))
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of a pipeline stage and count it as failed if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_failures.inc(stage=stage)
+        raise
+    finally:
+        stage_duration.observe(time.perf_counter() - start, stage=stage)
+
+
+def record_cache(cache, hit, count=1):
+    cache_requests.inc(count, cache=cache, result="hit" if hit else "miss")
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('output', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Paper',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arxiv_id', models.CharField(max_length=64, unique=True)),
+                ('title', models.TextField()),
+                ('authors', models.JSONField(blank=True, default=list)),
+                ('published', models.DateTimeField(blank=True, null=True)),
+                ('summary', models.TextField(blank=True)),
+                ('pdf_url', models.URLField(blank=True, max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(db_index=True, max_length=500)),
+                ('overall_summary', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Summary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('sections', models.JSONField(blank=True, null=True)),
+                ('paper', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='output.paper')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='output.searchrun')),
+            ],
+            options={
+                'ordering': ['position'],
+                'constraints': [models.UniqueConstraint(fields=('run', 'paper'), name='unique_summary_per_run_paper')],
+            },
+        ),
+        migrations.AddField(
+            model_name='searchrun',
+            name='papers',
+            field=models.ManyToManyField(related_name='search_runs', through='output.Summary', to='output.paper'),
+        ),
+        migrations.RemoveField(
+            model_name='searchjob',
+            name='result',
+        ),
+        migrations.AddField(
+            model_name='searchjob',
+            name='run',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='job', to='output.searchrun'),
+        ),
+    ]
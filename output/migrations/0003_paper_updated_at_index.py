@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('output', '0002_paper_searchrun_summary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paper',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('output', '0004_searchrun_user_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchrun',
+            name='payload',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='searchrun',
+            name='payload_br',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='searchrun',
+            name='payload_gzip',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='searchrun',
+            name='payload_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
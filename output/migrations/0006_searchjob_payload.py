@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('output', '0005_searchrun_payload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchjob',
+            name='payload',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='searchjob',
+            name='payload_br',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='searchjob',
+            name='payload_gzip',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='searchjob',
+            name='payload_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('output', '0006_searchjob_payload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchjob',
+            name='lease',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:10
+
+import glob
+import json
+import os
+
+from django.db import migrations
+from django.utils.dateparse import parse_datetime
+
+
+def import_legacy_metadata(apps, schema_editor):
+    """Load metadata the scraper used to write as JSON files into Paper"""
+    from output.utils import data_root
+
+    Paper = apps.get_model('output', 'Paper')
+    for path in sorted(glob.glob(os.path.join(data_root, 'metadata', '*.json'))):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not metadata.get('arxiv_id'):
+            continue
+        Paper.objects.get_or_create(
+            arxiv_id=metadata['arxiv_id'],
+            defaults={
+                'title': metadata.get('title') or '',
+                'authors': metadata.get('authors') or [],
+                'published': parse_datetime(metadata.get('published') or ''),
+                'summary': metadata.get('summary') or '',
+                'pdf_url': metadata.get('pdf_url') or '',
+            },
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('output', '0007_searchjob_lease'),
+    ]
+
+    operations = [
+        migrations.RunPython(import_legacy_metadata, migrations.RunPython.noop),
+    ]
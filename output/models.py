@@ -1 +1,112 @@
- 
\ No newline at end of file
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class Paper(models.Model):
+    arxiv_id = models.CharField(max_length=64, unique=True)
+    title = models.TextField()
+    authors = models.JSONField(default=list, blank=True)
+    published = models.DateTimeField(null=True, blank=True)
+    summary = models.TextField(blank=True)
+    pdf_url = models.URLField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every upsert, so it orders papers by when they were last seen
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return self.arxiv_id
+
+
+class StoredPayload(models.Model):
+    """A response serialized and precompressed once, so views can send it as it is"""
+    payload = models.BinaryField(null=True, blank=True, editable=False)
+    payload_gzip = models.BinaryField(null=True, blank=True, editable=False)
+    payload_br = models.BinaryField(null=True, blank=True, editable=False)
+    payload_hash = models.CharField(max_length=64, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+
+class SearchRun(StoredPayload):
+    # Null for searches made without logging in
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        null=True, blank=True, related_name='search_runs')
+    query = models.CharField(max_length=500, db_index=True)
+    overall_summary = models.TextField(blank=True)
+    papers = models.ManyToManyField(
+        Paper, through='Summary', related_name='search_runs')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.query
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Serves a user's history newest first, with id breaking ties
+            models.Index(
+                fields=['user', '-created_at', '-id'], name='searchrun_user_history'),
+        ]
+
+
+class Summary(models.Model):
+    run = models.ForeignKey(
+        SearchRun, on_delete=models.CASCADE, related_name='summaries')
+    paper = models.ForeignKey(
+        Paper, on_delete=models.CASCADE, related_name='summaries')
+    position = models.PositiveSmallIntegerField(default=0)
+    # Null when the paper was found but could not be summarized
+    sections = models.JSONField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.paper_id} in run {self.run_id}"
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['run', 'paper'], name='unique_summary_per_run_paper'),
+        ]
+
+
+class SearchJob(StoredPayload):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+        null=True, blank=True, related_name='search_jobs')
+    query = models.CharField(max_length=500)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    stage = models.CharField(max_length=50, blank=True)
+    progress = models.JSONField(default=dict, blank=True)
+    # Set by the worker that claimed the job; only it may update the job
+    lease = models.CharField(max_length=32, blank=True)
+    run = models.OneToOneField(
+        SearchRun, on_delete=models.SET_NULL, null=True, blank=True, related_name='job')
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.query} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
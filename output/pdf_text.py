@@ -0,0 +1,191 @@
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+
+from .utils import atomic_write_json, cache_root, sha256_file
+
+logging.getLogger('pypdf').setLevel(logging.ERROR)
+
+CHUNK_SIZE = 10000
+CHUNK_OVERLAP = 1000
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Text gathered from the page stream before it is split; the last chunk of
+# each window is carried over so chunks never end at a window boundary
+STREAM_SPLIT_WINDOW = CHUNK_SIZE * 8
+PAGE_SEPARATOR = "\n\n"
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_splitter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
+
+
+def split_text(full_text):
+    return _get_splitter().split_text(full_text)
+
+
+def iter_chunks(pages):
+    """Split a stream of pages into chunks, holding about one window of text at a time"""
+    buffer = None
+    for page in pages:
+        buffer = page if buffer is None else buffer + PAGE_SEPARATOR + page
+        if len(buffer) >= STREAM_SPLIT_WINDOW:
+            chunks = split_text(buffer)
+            yield from chunks[:-1]
+            buffer = chunks[-1] if chunks else ""
+    if buffer:
+        yield from split_text(buffer)
+
+
+def text_prefix(pages, limit):
+    """The first ``limit`` characters of the joined pages, reading only as many as needed"""
+    parts = []
+    length = 0
+    for page in pages:
+        if parts:
+            length += len(PAGE_SEPARATOR)
+        parts.append(page)
+        length += len(page)
+        if length >= limit:
+            break
+    return PAGE_SEPARATOR.join(parts)[:limit]
+
+
+class PageTextCache:
+    """Extracted page text on disk, keyed by the PDF's SHA-256.
+
+    Each PDF gets a ``.pages`` file of individually zlib-compressed pages and
+    a ``.json`` index of their byte offsets, so any page range can be read
+    without decompressing the rest. The index is written last and marks the
+    entry as complete.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.path.join(cache_root, 'pages')
+
+    def _paths(self, content_hash):
+        base = os.path.join(self.cache_dir, content_hash[:2], content_hash)
+        return base + '.pages', base + '.json'
+
+    def _index(self, content_hash):
+        _, index_path = self._paths(content_hash)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def has(self, content_hash):
+        return self._index(content_hash) is not None
+
+    def page_count(self, content_hash):
+        index = self._index(content_hash)
+        return len(index["offsets"]) if index else None
+
+    def text_length(self, content_hash):
+        """Length of the pages joined into one document, or None if not cached"""
+        index = self._index(content_hash)
+        if index is None:
+            return None
+        return index["chars"] + len(PAGE_SEPARATOR) * max(0, len(index["offsets"]) - 1)
+
+    def store(self, content_hash, pages):
+        """Compress and write ``pages`` one at a time; any iterable of strings works"""
+        pages_path, index_path = self._paths(content_hash)
+        os.makedirs(os.path.dirname(pages_path), exist_ok=True)
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(pages_path), suffix='.part')
+        offsets = []
+        position = 0
+        chars = 0
+        try:
+            with os.fdopen(tmp_fd, 'wb') as f:
+                for page in pages:
+                    blob = zlib.compress(page.encode('utf-8'))
+                    f.write(blob)
+                    offsets.append([position, len(blob)])
+                    position += len(blob)
+                    chars += len(page)
+            os.replace(tmp_path, pages_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        atomic_write_json(index_path, {"offsets": offsets, "chars": chars})
+
+    def read_pages(self, content_hash, start=0, stop=None):
+        """Return the text of pages ``start:stop``, or None if not cached"""
+        index = self._index(content_hash)
+        if index is None:
+            return None
+        pages_path, _ = self._paths(content_hash)
+        pages = []
+        with open(pages_path, 'rb') as f:
+            for offset, length in index["offsets"][start:stop]:
+                f.seek(offset)
+                pages.append(zlib.decompress(f.read(length)).decode('utf-8'))
+        return pages
+
+    def iter_pages(self, content_hash):
+        """Yield cached pages one at a time; raises KeyError if not cached"""
+        index = self._index(content_hash)
+        if index is None:
+            raise KeyError(content_hash)
+        pages_path, _ = self._paths(content_hash)
+        with open(pages_path, 'rb') as f:
+            for offset, length in index["offsets"]:
+                f.seek(offset)
+                yield zlib.decompress(f.read(length)).decode('utf-8')
+
+
+page_text_cache = PageTextCache()
+
+
+def extract_pages(pdf_path, content_hash=None):
+    """Make sure the PDF's page text is cached; returns its content hash.
+
+    Only PDFs that have never been seen are parsed with pypdf.
+    """
+    content_hash = content_hash or sha256_file(pdf_path)
+    if not page_text_cache.has(content_hash):
+        from langchain_community.document_loaders import PyPDFLoader
+
+        # Pages are written as pypdf yields them, never all held at once
+        loader = PyPDFLoader(pdf_path)
+        page_text_cache.store(
+            content_hash, (str(page.page_content) for page in loader.lazy_load()))
+    return content_hash
+
+
+def timed_extract_pages(pdf_path, content_hash=None):
+    """``extract_pages`` plus its wall time, for callers timing work in the parse pool"""
+    start = time.perf_counter()
+    content_hash = extract_pages(pdf_path, content_hash)
+    return content_hash, time.perf_counter() - start
+
+
+def get_parse_pool():
+    """Process pool for extract_pages; spawned so workers never inherit server threads"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PDF_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+    return _parse_pool
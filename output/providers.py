@@ -0,0 +1,72 @@
+"""Lazily constructed model clients.
+
+LangChain, the Gemini SDK and FAISS take seconds to import, so nothing
+here imports them until a client is first requested. Importing
+``output.views`` or running ``manage.py`` commands never pays that cost.
+"""
+import functools
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+TEXT_MODEL_NAME = "gemini-1.5-flash"
+EMBEDDING_MODEL_NAME = "models/embedding-001"
+# "gemini" or "fake" (deterministic, offline)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "gemini")
+
+
+def google_api_key():
+    """The Gemini API key; only the real backends need one"""
+    if not GOOGLE_API_KEY:
+        raise ImproperlyConfigured(
+            "GOOGLE_API_KEY is not set; export it, or run offline with "
+            "LLM_BACKEND=fake and EMBEDDING_BACKEND=fake")
+    return GOOGLE_API_KEY
+
+
+@functools.lru_cache(maxsize=None)
+def get_text_model():
+    import google.generativeai as genai
+
+    genai.configure(api_key=google_api_key())
+    return genai.GenerativeModel(model_name=TEXT_MODEL_NAME)
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm():
+    """LangChain chat wrapper around the same Gemini model"""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=TEXT_MODEL_NAME,
+        google_api_key=google_api_key(),
+        temperature=0.2,
+        convert_system_message_to_human=True,
+    )
+
+
+def get_embeddings():
+    """Embeddings backend behind the chunk-level embedding cache"""
+    from .embedding_cache import CachedEmbeddings, FakeEmbeddings
+
+    if EMBEDDING_BACKEND == "fake":
+        # Cached under their own model name so fake vectors never mix with real ones
+        return CachedEmbeddings(FakeEmbeddings(), "fake/" + EMBEDDING_MODEL_NAME)
+
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    return CachedEmbeddings(
+        GoogleGenerativeAIEmbeddings(
+            model=EMBEDDING_MODEL_NAME,
+            google_api_key=google_api_key()
+        ),
+        EMBEDDING_MODEL_NAME
+    )
+
+
+def get_vector_store_class():
+    from langchain.vectorstores import FAISS
+
+    return FAISS
@@ -0,0 +1,148 @@
+"""Question answering over papers that have already been ingested.
+
+Each paper's persisted FAISS index is loaded once and kept in a bounded
+in-process LRU, so a follow-up question costs one query embedding (itself
+cached), a few in-memory similarity searches and a single LLM call.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .llm_gateway import get_gateway
+from .metrics import record_cache, timed
+from .research_model import RETRIEVER_K, RAGPipeline, index_dir_for
+from .scraper import pdf_path_for
+
+QA_RETRIEVER_CACHE_SIZE = int(os.getenv("QA_RETRIEVER_CACHE_SIZE", "32"))
+QA_MAX_PAPERS = int(os.getenv("QA_MAX_PAPERS", "20"))
+QA_EXCERPT_PREVIEW = 500
+
+QA_TEMPLATE = """Answer the question using only the excerpts from research papers below.
+Cite the arXiv id of every excerpt you rely on in square brackets, e.g. [2401.00001v1].
+If the excerpts do not contain the answer, say so instead of guessing.
+
+Excerpts:
+{context}
+
+Question: {question}
+"""
+
+
+class PaperNotIngested(Exception):
+    pass
+
+
+class RetrieverCache:
+    """Loaded vector stores by arXiv id, evicting the least recently used.
+
+    Entries remember the mtime of the index manifest they were loaded from
+    and are reloaded when the paper is re-ingested.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or QA_RETRIEVER_CACHE_SIZE
+        self._stores = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def _manifest_mtime(self, arxiv_id):
+        manifest = os.path.join(index_dir_for(pdf_path_for(arxiv_id)), "manifest.json")
+        try:
+            return os.stat(manifest).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self, arxiv_id):
+        pdf_path = pdf_path_for(arxiv_id)
+        if not os.path.exists(pdf_path):
+            raise PaperNotIngested(arxiv_id)
+        store = RAGPipeline(pdf_path).load_persisted_index()
+        if store is None:
+            raise PaperNotIngested(arxiv_id)
+        return store
+
+    def get(self, arxiv_id):
+        mtime = self._manifest_mtime(arxiv_id)
+        with self._lock:
+            entry = self._stores.get(arxiv_id)
+            if entry is not None and entry[0] == mtime:
+                self._stores.move_to_end(arxiv_id)
+                record_cache("retriever", True)
+                return entry[1]
+            # One thread loads a given paper; the others wait for it
+            load_lock = self._loading.setdefault(arxiv_id, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._stores.get(arxiv_id)
+                if entry is not None and entry[0] == mtime:
+                    self._stores.move_to_end(arxiv_id)
+                    return entry[1]
+            record_cache("retriever", False)
+            try:
+                store = self._load(arxiv_id)
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(arxiv_id, None)
+                raise
+            # Stored before the load lock is dropped, so a thread arriving in
+            # between finds the store instead of loading it again
+            with self._lock:
+                self._stores[arxiv_id] = (mtime, store)
+                self._stores.move_to_end(arxiv_id)
+                while len(self._stores) > self.max_entries:
+                    self._stores.popitem(last=False)
+                self._loading.pop(arxiv_id, None)
+        return store
+
+    def clear(self):
+        with self._lock:
+            self._stores.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._stores)
+
+
+retriever_cache = RetrieverCache()
+
+
+def answer_question(question, arxiv_ids, k=None, gateway=None, cache=None):
+    """Answer ``question`` from the ``k`` closest chunks across the given papers"""
+    k = k or RETRIEVER_K
+    gateway = gateway or get_gateway()
+    cache = cache if cache is not None else retriever_cache
+    arxiv_ids = list(dict.fromkeys(arxiv_ids))
+
+    start = time.perf_counter()
+    with timed("qa_retrieval"):
+        stores = [(arxiv_id, cache.get(arxiv_id)) for arxiv_id in arxiv_ids]
+        # Every index uses the same embedding model, so the question is embedded once
+        vector = stores[0][1].embeddings.embed_query(question)
+        hits = []
+        for arxiv_id, store in stores:
+            for doc, score in store.similarity_search_with_score_by_vector(vector, k=k):
+                hits.append((float(score), arxiv_id, doc.page_content))
+        # FAISS scores are L2 distances, so smaller is closer
+        hits.sort(key=lambda hit: hit[0])
+        hits = hits[:k]
+    retrieved = time.perf_counter()
+
+    context = "\n\n---\n\n".join(f"[{arxiv_id}]\n{text}" for _, arxiv_id, text in hits)
+    with timed("qa_answer"):
+        answer = gateway.generate(QA_TEMPLATE.format(context=context, question=question))
+    answered = time.perf_counter()
+
+    return {
+        "question": question,
+        "answer": answer,
+        "sources": [
+            {"arxiv_id": arxiv_id, "score": score, "excerpt": text[:QA_EXCERPT_PREVIEW]}
+            for score, arxiv_id, text in hits
+        ],
+        "timings_ms": {
+            "retrieval": round((retrieved - start) * 1000, 1),
+            "generation": round((answered - retrieved) * 1000, 1),
+        },
+    }
@@ -0,0 +1,108 @@
+import json
+import os
+import re
+import threading
+import time
+
+from .metrics import record_cache
+from .utils import cache_root, connect_sqlite, sha256_text
+
+ARXIV_QUERY_CACHE_TTL = int(os.getenv("ARXIV_QUERY_CACHE_TTL", "3600"))
+ARXIV_QUERY_CACHE_SIZE = int(os.getenv("ARXIV_QUERY_CACHE_SIZE", "1000"))
+
+BOOLEAN_OPERATORS = {"AND", "OR", "ANDNOT"}
+
+
+def normalize_query(query):
+    """Canonical form of a search query for cache lookups.
+
+    Case and whitespace never matter. For simple AND queries (plain terms,
+    optionally joined by AND) term order does not matter either, so the terms
+    are sorted; anything with OR, ANDNOT, grouping or phrases keeps its order.
+    """
+    tokens = query.split()
+    if not tokens:
+        return ""
+    if re.search(r'[()"]', query) or any(t in ("OR", "ANDNOT") for t in tokens):
+        return " ".join(t if t in BOOLEAN_OPERATORS else t.lower() for t in tokens)
+    terms = {t.lower() for t in tokens if t != "AND"}
+    return " ".join(sorted(terms))
+
+
+class QueryCache:
+    """Parsed arXiv results shared by every worker on the host via SQLite.
+
+    Entries expire after ``ttl`` seconds; once more than ``max_entries`` are
+    stored the least recently read ones are evicted.
+    """
+
+    def __init__(self, db_path=None, ttl=None, max_entries=None):
+        self.db_path = db_path or os.path.join(cache_root, 'arxiv_queries.sqlite3')
+        self.ttl = ARXIV_QUERY_CACHE_TTL if ttl is None else ttl
+        self.max_entries = ARXIV_QUERY_CACHE_SIZE if max_entries is None else max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect_sqlite(self.db_path)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS query_results ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, last_access REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS query_results_last_access '
+                'ON query_results (last_access)')
+            self._local.conn = conn
+        return conn
+
+    def make_key(self, query, **params):
+        return sha256_text(normalize_query(query), *sorted(params.items()))
+
+    def _count(self, hit):
+        record_cache("arxiv_query", hit)
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, query, **params):
+        key = self.make_key(query, **params)
+        now = time.time()
+        row = self.conn.execute(
+            'SELECT value, expires_at FROM query_results WHERE key = ?', (key,)).fetchone()
+        if row is None or row[1] <= now:
+            self._count(False)
+            return None
+        with self.conn:
+            self.conn.execute(
+                'UPDATE query_results SET last_access = ? WHERE key = ?', (now, key))
+        self._count(True)
+        return json.loads(row[0])
+
+    def set(self, query, value, **params):
+        key = self.make_key(query, **params)
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO query_results (key, value, expires_at, last_access) '
+                'VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), now + self.ttl, now))
+            self.conn.execute('DELETE FROM query_results WHERE expires_at <= ?', (now,))
+            self.conn.execute(
+                'DELETE FROM query_results WHERE key IN ('
+                'SELECT key FROM query_results ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,))
+
+    def stats(self):
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+query_cache = QueryCache()
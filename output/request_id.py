@@ -0,0 +1,54 @@
+"""Request ids for log lines.
+
+The middleware takes the id from an incoming ``X-Request-ID`` header or
+makes one up, and echoes it on the response. Search jobs carry the id of
+the request that submitted them, and work handed to thread pools keeps it
+through ``in_current_context``.
+"""
+import contextvars
+import logging
+import uuid
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+
+def get_request_id():
+    return request_id_var.get()
+
+
+def in_current_context(fn):
+    """Wrap ``fn`` so it runs with the caller's request id in any thread"""
+    request_id = request_id_var.get()
+
+    def run(*args, **kwargs):
+        token = request_id_var.set(request_id)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            request_id_var.reset(token)
+
+    return run
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class RequestIdMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, "")[:64] or uuid.uuid4().hex
+        request.request_id = request_id
+        token = request_id_var.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id_var.reset(token)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
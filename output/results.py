@@ -0,0 +1,98 @@
+import gzip
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import Paper, SearchRun, Summary
+
+try:
+    import brotli
+except ImportError:  # Optional; without it only gzip is precomputed
+    brotli = None
+
+
+def upsert_paper(metadata):
+    paper, _ = Paper.objects.update_or_create(
+        arxiv_id=metadata["arxiv_id"],
+        defaults={
+            "title": metadata.get("title") or "",
+            "authors": metadata.get("authors") or [],
+            "published": parse_datetime(metadata.get("published") or ""),
+            "summary": metadata.get("summary") or "",
+            "pdf_url": metadata.get("pdf_url") or "",
+        },
+    )
+    return paper
+
+
+@transaction.atomic
+def save_search_run(query, outcome, user_id=None):
+    """Store one pipeline run's papers and summaries as its own rows"""
+    outcome = outcome or {}
+    run = SearchRun.objects.create(
+        user_id=user_id, query=query, overall_summary=outcome.get("overall_summary") or "")
+
+    summaries = outcome.get("summaries") or {}
+    Summary.objects.bulk_create([
+        Summary(
+            run=run,
+            paper=upsert_paper(metadata),
+            position=position,
+            sections=summaries.get(metadata["arxiv_id"]),
+        )
+        for position, metadata in enumerate(outcome.get("papers") or [])
+    ])
+    return store_payload(run, serialize_run(run))
+
+
+def serialize_paper(paper):
+    return {
+        "arxiv_id": paper.arxiv_id,
+        "title": paper.title,
+        "authors": paper.authors,
+        "published": paper.published.strftime("%Y-%m-%d %H:%M:%S") if paper.published else None,
+        "summary": paper.summary,
+        "pdf_url": paper.pdf_url,
+    }
+
+
+def serialize_run(run):
+    summaries = run.summaries.select_related('paper').order_by('position')
+    summary_data = {}
+    metadata_list = []
+    for summary in summaries:
+        metadata_list.append(serialize_paper(summary.paper))
+        if summary.sections:
+            summary_data[summary.paper.arxiv_id] = summary.sections
+
+    return {
+        "run_id": run.id,
+        "query": run.query,
+        "summary_data": summary_data,
+        "metadata_list": metadata_list,
+        "overall_summary": run.overall_summary,
+    }
+
+
+def store_payload(instance, data):
+    """Store ``data`` as JSON on ``instance`` with its hash and compressed forms"""
+    body = json.dumps(
+        data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+    instance.payload = body
+    instance.payload_hash = hashlib.sha256(body).hexdigest()
+    # mtime=0 keeps the gzip bytes a function of the body alone
+    instance.payload_gzip = gzip.compress(body, compresslevel=9, mtime=0)
+    instance.payload_br = brotli.compress(body, quality=11) if brotli is not None else None
+    instance.save(update_fields=['payload', 'payload_hash', 'payload_gzip', 'payload_br'])
+    return instance
+
+
+def load_payload(run):
+    """``serialize_run(run)``, read back from the stored payload when there is one"""
+    if run.payload:
+        return json.loads(bytes(run.payload))
+    return serialize_run(run)
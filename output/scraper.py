@@ -1,116 +1,179 @@
 import requests
-import xml.etree.ElementTree as ET
+import itertools
+import logging
 import os
-import json
 import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from .arxiv_client import ArxivError, get_client
+from .metadata_index import save_metadata
+from .metrics import pdf_download_bytes, timed
+from .query_cache import query_cache
+from .request_id import in_current_context
 from .research_model import main_model
+from .utils import data_root
 
-base_dir = os.path.dirname(os.path.abspath(__file__))
-metadata_dir = os.path.join(base_dir, 'data', 'metadata')
-pdf_dir = os.path.join(base_dir, 'data', 'pdf')
-os.makedirs(metadata_dir, exist_ok=True)
+logger = logging.getLogger(__name__)
+
+pdf_dir = os.path.join(data_root, 'pdf')
 os.makedirs(pdf_dir, exist_ok=True)
 
+PDF_DOWNLOAD_CONCURRENCY = int(os.getenv("PDF_DOWNLOAD_CONCURRENCY", "4"))
+PDF_CHUNK_SIZE = 64 * 1024
 
-def search_arxiv(query, start=0, max_results=3, sortBY='relevance'):
+_session = None
+_session_lock = threading.Lock()
 
-    arxiv_base_url = "http://export.arxiv.org/api/query?"
-    url = f"{arxiv_base_url}search_query={query}&start={start}&max_results={max_results}&sortBy={sortBY}&sortOrder=descending"
 
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        root = ET.fromstring(response.content)
-        return root
-    except requests.RequestException as e:
-        print(f"Request error: {e}")
-    except ET.ParseError as e:
-        print(f"XML parsing error: {e}")
-    return None
+def get_session():
+    """Shared keep-alive session so downloads reuse pooled connections"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=PDF_DOWNLOAD_CONCURRENCY,
+                pool_maxsize=PDF_DOWNLOAD_CONCURRENCY
+            )
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+    return _session
 
 
-def sanitize_filename(name):
-    return re.sub(r'[^\w\-_. ]', '_', name)
-
-
-def save_metadata_and_pdf(entry):
-    """Save metadata and download the PDF"""
-    title = entry.find('{http://www.w3.org/2005/Atom}title').text
-    authors = [author.find('{http://www.w3.org/2005/Atom}name').text for author in entry.findall(
-        '{http://www.w3.org/2005/Atom}author')]
-    summary = entry.find('{http://www.w3.org/2005/Atom}summary').text
-    published = entry.find('{http://www.w3.org/2005/Atom}published').text
-    pdf_url = entry.find(
-        '{http://www.w3.org/2005/Atom}id').text.replace('abs', 'pdf') + ".pdf"
-    arxiv_id = entry.find(
-        '{http://www.w3.org/2005/Atom}id').text.split('/')[-1]
-
-    print(f"\nTitle: {title}")
-    print(f"Authors: {', '.join(authors)}")
-    print(f"Published: {published}")
-    print(f"Summary: {summary}")
-    print(f"PDF URL: {pdf_url}")
-
-    metadata = {
-        "arxiv_id": arxiv_id,
-        "title": title,
-        "authors": authors,
-        "published": published,
-        "summary": summary,
-        "pdf_url": pdf_url
-    }
-
-    metadata_filename = os.path.join(
-        metadata_dir, f"{sanitize_filename(arxiv_id)}.json")
-    with open(metadata_filename, 'w', encoding='utf-8') as metadata_file:
-        json.dump(metadata, metadata_file, indent=4)
+def search_arxiv(query, start=0, max_results=3, sortBY='relevance'):
+    """Return metadata dicts for the query's top results, or None on failure"""
+    cache_params = {"start": start, "max_results": max_results, "sort_by": sortBY}
+    cached = query_cache.get(query, **cache_params)
+    if cached is not None:
+        logger.info("Using cached arXiv results for %r", query)
+        return cached
 
     try:
-        pdf_response = requests.get(pdf_url, timeout=15)
-        pdf_response.raise_for_status()
-        pdf_filename = os.path.join(
-            pdf_dir, f"{sanitize_filename(arxiv_id)}.pdf")
-        with open(pdf_filename, 'wb') as pdf_file:
-            pdf_file.write(pdf_response.content)
-        print(f" Saved metadata and PDF for {arxiv_id}")
-    except requests.RequestException as e:
-        print(f"Failed to download PDF: {e}")
+        with timed("arxiv_search"):
+            results = get_client().iter_search(
+                query, max_results=start + max_results, sort_by=sortBY)
+            papers = list(itertools.islice(results, start, None))
+    except ArxivError as e:
+        logger.warning("arXiv error: %s", e)
+        return None
 
-    print("/n")
+    query_cache.set(query, papers, **cache_params)
+    return papers
 
 
-def Scrapping(query):
+def sanitize_filename(name):
+    return re.sub(r'[^\w\-_. ]', '_', name)
 
-    root = search_arxiv(query, sortBY='relevance')
 
-    if root is None:
-        print("No results found.")
-        return
+def pdf_path_for(arxiv_id):
+    return os.path.join(pdf_dir, f"{sanitize_filename(arxiv_id)}.pdf")
 
-    entries = root.findall('{http://www.w3.org/2005/Atom}entry')
-    if not entries:
-        print("No papers found for your query.")
-        return
 
-    print(f"\nFound {len(entries)} papers:\n")
-    for idx, entry in enumerate(entries, start=1):
-        title = entry.find('{http://www.w3.org/2005/Atom}title').text
-        authors = [author.find('{http://www.w3.org/2005/Atom}name').text for author in entry.findall(
-            '{http://www.w3.org/2005/Atom}author')]
-        published = entry.find('{http://www.w3.org/2005/Atom}published').text
-        print(
-            f"{idx}. {title}\n   Authors: {', '.join(authors)}\n   Published: {published}\n")
+def download_pdf(metadata, session=None):
+    """Stream a PDF to a temp file in chunks and atomically move it into place"""
+    session = session or get_session()
+    arxiv_id = metadata["arxiv_id"]
+    pdf_filename = pdf_path_for(arxiv_id)
 
-    # Automatically download all PDFs
-    for i, entry in enumerate(entries):
+    tmp_fd, tmp_path = tempfile.mkstemp(
+        dir=pdf_dir, prefix=f".{sanitize_filename(arxiv_id)}.", suffix=".part")
+    try:
+        # The file owns the descriptor from here on, so a failed request closes it too
+        with os.fdopen(tmp_fd, 'wb') as pdf_file, timed("pdf_download"), \
+                session.get(metadata["pdf_url"], timeout=15, stream=True) as pdf_response:
+            pdf_response.raise_for_status()
+            for chunk in pdf_response.iter_content(chunk_size=PDF_CHUNK_SIZE):
+                pdf_file.write(chunk)
+                pdf_download_bytes.inc(len(chunk))
+        os.replace(tmp_path, pdf_filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    logger.info("Saved PDF for %s", arxiv_id)
+    return pdf_filename
+
+
+def download_pdfs(metadata_list, max_workers=None, on_event=None):
+    """Download every PDF concurrently; returns paths in input order (None on failure)"""
+    max_workers = max_workers or PDF_DOWNLOAD_CONCURRENCY
+    paths = [None] * len(metadata_list)
+    if not metadata_list:
+        return paths
+
+    session = get_session()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pdf-download') as pool:
+        futures = {
+            pool.submit(in_current_context(download_pdf), metadata, session): i
+            for i, metadata in enumerate(metadata_list)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                paths[i] = future.result()
+            except Exception as e:
+                logger.warning("Failed to download PDF for %s: %s",
+                               metadata_list[i]['arxiv_id'], e)
+            if on_event:
+                on_event("download", done=done, total=len(metadata_list))
+    return paths
+
+
+def Scrapping(query, on_event=None):
+
+    if on_event:
+        on_event("search", query=query)
+    papers = search_arxiv(query, sortBY='relevance')
+
+    if papers is None:
+        logger.info("No results found.")
+        return None
+
+    if not papers:
+        logger.info("No papers found for your query.")
+        return None
+
+    logger.info("Found %d papers", len(papers))
+    for idx, paper in enumerate(papers, start=1):
+        logger.info("%d. %s | Authors: %s | Published: %s", idx, paper['title'],
+                    ', '.join(paper['authors']), paper['published'])
+
+    metadata_list = []
+    for i, metadata in enumerate(papers):
         try:
-            save_metadata_and_pdf(entry)
+            save_metadata(metadata)
+            metadata_list.append(metadata)
         except Exception as e:
-            print(f"Failed to download paper {i+1}: {e}")
-    main_model()
-    print("i am here")
+            logger.warning("Failed to save metadata for paper %d: %s", i + 1, e)
+
+    if on_event:
+        on_event("papers", papers=metadata_list)
+
+    # Automatically download all PDFs
+    if on_event:
+        on_event("download", done=0, total=len(metadata_list))
+    pdf_paths = download_pdfs(metadata_list, on_event=on_event)
+
+    downloaded = [path for path in pdf_paths if path]
+    outcome = main_model(downloaded, on_event=on_event, metadata=metadata_list)
+
+    # Re-key summaries by arXiv id so callers never depend on file paths
+    summaries = {}
+    for metadata, path in zip(metadata_list, pdf_paths):
+        if path in outcome["summary_data"]:
+            summaries[metadata["arxiv_id"]] = outcome["summary_data"][path]
+
+    return {
+        "papers": metadata_list,
+        "summaries": summaries,
+        "overall_summary": outcome["overall_summary"],
+    }
 
 
 if __name__ == "__main__":
-    Scrapping()
-    print("Scraping completed.")
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    Scrapping(" ".join(sys.argv[1:]))
+    logger.info("Scraping completed.")
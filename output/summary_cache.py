@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from .metrics import record_cache
+from .utils import atomic_write_json, cache_root, sha256_text
+
+
+class SummaryCache:
+    """Persistent per-paper summary store.
+
+    Entries are content addressed by arXiv id, PDF hash, model name and
+    prompt hash, and grouped in one directory per paper so a single paper
+    can be invalidated without scanning the whole cache.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.path.join(cache_root, 'summaries')
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, arxiv_id, content_hash, model_name, prompt_hash):
+        return sha256_text(arxiv_id, content_hash, model_name, prompt_hash)
+
+    def _paper_dir(self, arxiv_id):
+        return os.path.join(self.cache_dir, sha256_text(arxiv_id)[:16])
+
+    def _path(self, arxiv_id, key):
+        return os.path.join(self._paper_dir(arxiv_id), f"{key}.json")
+
+    def get(self, arxiv_id, content_hash, model_name, prompt_hash):
+        key = self.make_key(arxiv_id, content_hash, model_name, prompt_hash)
+        try:
+            with open(self._path(arxiv_id, key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            record_cache("summary", False)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        record_cache("summary", True)
+        with self._lock:
+            self.hits += 1
+        return entry["sections"]
+
+    def set(self, arxiv_id, content_hash, model_name, prompt_hash, sections):
+        key = self.make_key(arxiv_id, content_hash, model_name, prompt_hash)
+        atomic_write_json(self._path(arxiv_id, key), {
+            "arxiv_id": arxiv_id,
+            "content_hash": content_hash,
+            "model": model_name,
+            "prompt_hash": prompt_hash,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "sections": sections,
+        })
+        return key
+
+    def invalidate(self, arxiv_id=None, keep_prompt_hash=None):
+        """Remove cached summaries.
+
+        With ``arxiv_id`` only that paper is considered. With
+        ``keep_prompt_hash`` only entries produced by a different prompt are
+        removed, which is what callers want after editing a prompt template.
+        """
+        if arxiv_id is not None:
+            paper_dirs = [self._paper_dir(arxiv_id)]
+        elif os.path.isdir(self.cache_dir):
+            paper_dirs = [entry.path for entry in os.scandir(self.cache_dir)
+                          if entry.is_dir()]
+        else:
+            paper_dirs = []
+
+        removed = 0
+        for paper_dir in paper_dirs:
+            if not os.path.isdir(paper_dir):
+                continue
+            for entry in os.scandir(paper_dir):
+                if not entry.name.endswith('.json'):
+                    continue
+                if keep_prompt_hash is not None:
+                    try:
+                        with open(entry.path, 'r', encoding='utf-8') as f:
+                            if json.load(f).get("prompt_hash") == keep_prompt_hash:
+                                continue
+                    except (OSError, ValueError):
+                        pass
+                os.remove(entry.path)
+                removed += 1
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+summary_cache = SummaryCache()
@@ -0,0 +1,149 @@
+"""Hierarchical, cached synthesis of many paper summaries.
+
+Paper summaries are the leaves of a tree. Consecutive leaves (in arXiv id
+order) are grouped, each group is synthesized into one intermediate note,
+and the notes are grouped again until at most ``SYNTHESIS_FAN_IN`` remain
+for the final overall summary. Nothing is truncated; every prompt holds
+at most ``2 * SYNTHESIS_FAN_IN`` members.
+
+Group boundaries are picked from the members' own hashes, not their
+positions, so adding a paper changes only the group it lands in and that
+group's ancestors. Every node is cached by the keys of its members, so
+everything else is reused and a new paper costs about one LLM call per
+tree level.
+"""
+import os
+import threading
+import time
+from concurrent.futures import wait
+
+from .metrics import record_cache
+from .request_id import in_current_context
+from .utils import cache_root, connect_sqlite, sha256_text
+
+SYNTHESIS_FAN_IN = max(2, int(os.getenv("SYNTHESIS_FAN_IN", "4")))
+
+GROUP_SYNTHESIS_TEMPLATE = """Combine the research notes below into one synthesis.
+Keep every distinct finding, method and recommendation, note where the sources agree or differ,
+and keep the arXiv id of the source next to each point.
+
+Notes:
+{text}"""
+
+OVERALL_SUMMARY_TEMPLATE = """
+    You are given summaries of multiple documents. Provide a comprehensive overall summary synthesizing the information, highlighting common themes, differences, and key insights. Each document summary is preceded by citation metadata.
+
+    Summaries:
+    {text}
+    """
+
+SEPARATOR = "\n\n---\n\n"
+
+
+class SynthesisCache:
+    """Synthesized node text by node key, shared by every worker on the host"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(cache_root, 'syntheses.sqlite3')
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect_sqlite(self.db_path)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS syntheses ('
+                'key TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self.conn.execute('SELECT text FROM syntheses WHERE key = ?', (key,)).fetchone()
+        record_cache("synthesis", row is not None)
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return row[0] if row else None
+
+    def set(self, key, text):
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO syntheses (key, text, created_at) VALUES (?, ?, ?)',
+                (key, text, time.time()))
+
+    def stats(self):
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+synthesis_cache = SynthesisCache()
+
+
+def group_nodes(nodes, fan_in=None):
+    """Split ``(key, text)`` nodes into runs of 2 to ``2 * fan_in`` members.
+
+    A run ends after a node whose key picks it as a boundary, which happens
+    for about one node in ``fan_in``, so boundaries move with the content
+    rather than with positions.
+    """
+    fan_in = fan_in or SYNTHESIS_FAN_IN
+    groups = [[]]
+    for key, text in nodes:
+        group = groups[-1]
+        group.append((key, text))
+        boundary = int(key[:8], 16) % fan_in == 0
+        if (boundary and len(group) >= 2) or len(group) >= 2 * fan_in:
+            groups.append([])
+    if not groups[-1]:
+        groups.pop()
+    # A trailing single node joins the group before it
+    if len(groups) > 1 and len(groups[-1]) == 1:
+        groups[-2].extend(groups.pop())
+    return groups
+
+
+class Synthesizer:
+    def __init__(self, gateway, model_name, cache=None, pool=None, fan_in=None):
+        self.gateway = gateway
+        self.model_name = model_name
+        self.cache = cache if cache is not None else synthesis_cache
+        self.pool = pool
+        self.fan_in = fan_in or SYNTHESIS_FAN_IN
+        self.stats = {"nodes": 0, "generated": 0}
+        self._lock = threading.Lock()
+
+    def _node(self, template, members):
+        key = sha256_text(self.model_name, template, *(member_key for member_key, _ in members))
+        text = self.cache.get(key)
+        generated = text is None
+        if generated:
+            text = self.gateway.generate(template.format(
+                text=SEPARATOR.join(member_text for _, member_text in members)))
+            self.cache.set(key, text)
+        with self._lock:
+            self.stats["nodes"] += 1
+            self.stats["generated"] += int(generated)
+        return key, text
+
+    def _level(self, groups):
+        if self.pool is None or len(groups) == 1:
+            return [self._node(GROUP_SYNTHESIS_TEMPLATE, group) for group in groups]
+        futures = [self.pool.submit(in_current_context(self._node), GROUP_SYNTHESIS_TEMPLATE, group)
+                   for group in groups]
+        wait(futures)
+        return [future.result() for future in futures]
+
+    def synthesize(self, leaves):
+        """Overall summary of ``(key, text)`` leaves, already in a stable order"""
+        nodes = list(leaves)
+        while len(nodes) > self.fan_in:
+            nodes = self._level(group_nodes(nodes, self.fan_in))
+        _, text = self._node(OVERALL_SUMMARY_TEMPLATE, nodes)
+        return text
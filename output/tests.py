@@ -1,5 +1,620 @@
-# from django.test import TestCase
-# import shutil
+import gzip
+import importlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# # Create your tests here.
-# shutil.rmtree("data")
+import requests
+import urllib3
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from user.authentication import UserRefreshToken
+from user.models import User
+
+from .arxiv_client import ArxivClient, ArxivError, RateLimiter
+from .arxiv_stub import StubArxivServer, stub_paper_text
+from .dedup import NearDuplicateIndex
+from .embedding_cache import CachedEmbeddings, EmbeddingCache, FakeEmbeddings
+from .jobs import (
+    resume_interrupted_jobs, run_search_job, serialize_job, should_resume_on_start, touch_job,
+)
+from .llm_gateway import FakeBackend, GeminiBackend, LLMGateway
+from .metadata_index import get_metadata, recent_metadata, run_metadata, save_metadata
+from .models import SearchJob, SearchRun
+from .pdf_text import (
+    PAGE_SEPARATOR, STREAM_SPLIT_WINDOW, PageTextCache, iter_chunks, split_text, text_prefix,
+)
+from .providers import TEXT_MODEL_NAME, google_api_key
+from .qa import RetrieverCache
+from .query_cache import QueryCache, normalize_query
+from .research_model import SUMMARY_PROMPT_HASH, MultiPDFProcessor
+from .results import save_search_run, store_payload
+from .scraper import download_pdf
+from .summary_cache import SummaryCache
+from .synthesis import SynthesisCache, Synthesizer, group_nodes
+from .utils import sha256_text
+
+
+def make_outcome(count=2):
+    papers = [{
+        "arxiv_id": f"2401.0000{i}v1",
+        "title": f"Paper {i}",
+        "authors": ["A. Author"],
+        "published": "2024-01-0{}T00:00:00Z".format(i + 1),
+        "summary": "Abstract",
+        "pdf_url": f"http://arxiv.org/pdf/2401.0000{i}v1",
+    } for i in range(count)]
+    return {
+        "papers": papers,
+        "summaries": {p["arxiv_id"]: {"key findings": "## Findings\n" * 50} for p in papers},
+        "overall_summary": "Overall",
+    }
+
+
+def make_user(email='ada@example.com'):
+    return User.objects.create_user(email=email, fullname='Ada', password='secret-1')
+
+
+def client_for(user):
+    client = APIClient()
+    token = UserRefreshToken.for_user(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+class BrokenStream:
+    def read(self, size=-1):
+        raise urllib3.exceptions.ProtocolError("Connection broken")
+
+    def close(self):
+        pass
+
+
+class ArxivClientTests(SimpleTestCase):
+    def client_for(self, response):
+        session = mock.Mock()
+        session.get.return_value = response
+        return ArxivClient(session=session, limiter=RateLimiter(0), max_retries=0)
+
+    def test_connection_dropped_mid_stream_is_an_arxiv_error(self):
+        response = mock.Mock(status_code=200, headers={}, raw=BrokenStream())
+        with self.assertRaises(ArxivError):
+            self.client_for(response).search("rag")
+
+    def test_connection_dropped_while_buffering_is_an_arxiv_error(self):
+        response = mock.Mock(status_code=200, headers={"ETag": '"abc"'})
+        type(response).content = mock.PropertyMock(
+            side_effect=requests.exceptions.ChunkedEncodingError("Connection broken"))
+        with self.assertRaises(ArxivError):
+            self.client_for(response).search("rag")
+
+
+    def test_ids_are_looked_up_in_batches(self):
+        ids = ["9901.00001v1", "9901.00002v1", "9901.00001v1", "9901.00003v1", "9901.00004v1"]
+        with StubArxivServer() as stub:
+            client = ArxivClient(base_url=stub.api_url, limiter=RateLimiter(0))
+            papers = client.fetch_by_ids(ids, batch_size=2)
+            requests_made = len(stub.request_log)
+
+        self.assertEqual([paper["arxiv_id"] for paper in papers],
+                         ["9901.00001v1", "9901.00002v1", "9901.00003v1", "9901.00004v1"])
+        self.assertEqual(requests_made, 2)
+
+
+class DownloadPdfTests(SimpleTestCase):
+    def test_failed_download_closes_and_removes_its_temp_file(self):
+        session = mock.Mock()
+        session.get.side_effect = requests.ConnectionError("refused")
+        metadata = {"arxiv_id": "2401.00001v1", "pdf_url": "http://arxiv.invalid/pdf"}
+
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('output.scraper.pdf_dir', directory):
+            open_fds = len(os.listdir('/proc/self/fd'))
+            for _ in range(5):
+                with self.assertRaises(requests.ConnectionError):
+                    download_pdf(metadata, session=session)
+            self.assertEqual(len(os.listdir('/proc/self/fd')), open_fds)
+            self.assertEqual(os.listdir(directory), [])
+
+
+class QueryCacheTests(SimpleTestCase):
+    def test_simple_queries_ignore_case_whitespace_and_term_order(self):
+        self.assertEqual(normalize_query("  LLM   Databases "), "databases llm")
+        self.assertEqual(normalize_query("databases AND llm"), "databases llm")
+        self.assertEqual(normalize_query("   "), "")
+
+    def test_or_and_phrase_queries_keep_their_order(self):
+        self.assertEqual(normalize_query("LLM OR databases"), "llm OR databases")
+        self.assertNotEqual(normalize_query("llm OR databases"),
+                            normalize_query("databases OR llm"))
+        self.assertEqual(normalize_query('"Graph Neural" networks'), '"graph neural" networks')
+        self.assertNotEqual(normalize_query('"graph neural" networks'),
+                            normalize_query('networks "graph neural"'))
+
+    def make_cache(self, directory, **kwargs):
+        return QueryCache(db_path=os.path.join(directory, "queries.sqlite3"), **kwargs)
+
+    def test_equivalent_queries_share_an_entry(self):
+        with tempfile.TemporaryDirectory() as directory:
+            queries = self.make_cache(directory)
+            queries.set("LLM databases", ["paper"], max_results=3)
+            self.assertEqual(queries.get("databases  llm", max_results=3), ["paper"])
+            self.assertIsNone(queries.get("databases llm", max_results=5))
+
+    def test_entries_expire_after_the_ttl(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('output.query_cache.time.time') as now:
+            queries = self.make_cache(directory, ttl=60)
+            now.return_value = 1000.0
+            queries.set("llm", ["paper"])
+            now.return_value = 1059.0
+            self.assertEqual(queries.get("llm"), ["paper"])
+            now.return_value = 1060.0
+            self.assertIsNone(queries.get("llm"))
+
+    def test_least_recently_read_entries_are_evicted(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('output.query_cache.time.time') as now:
+            queries = self.make_cache(directory, ttl=3600, max_entries=3)
+            for second, query in enumerate(["a", "b", "c"]):
+                now.return_value = 1000.0 + second
+                queries.set(query, [query])
+            now.return_value = 1010.0
+            queries.get("a")
+            now.return_value = 1020.0
+            queries.set("d", ["d"])
+
+            self.assertIsNone(queries.get("b"))
+            for query in ("a", "c", "d"):
+                self.assertEqual(queries.get(query), [query])
+
+
+class PageTextCacheTests(SimpleTestCase):
+    def test_page_ranges_round_trip(self):
+        text = ["first page", "", "third page \u00e9", "fourth page"]
+        with tempfile.TemporaryDirectory() as directory:
+            pages = PageTextCache(cache_dir=directory)
+            self.assertIsNone(pages.read_pages("ab" * 32))
+            pages.store("ab" * 32, iter(text))
+
+            self.assertEqual(pages.page_count("ab" * 32), 4)
+            self.assertEqual(pages.read_pages("ab" * 32), text)
+            self.assertEqual(pages.read_pages("ab" * 32, 1, 3), text[1:3])
+            self.assertEqual(pages.read_pages("ab" * 32, 3), text[3:])
+            self.assertEqual(list(pages.iter_pages("ab" * 32)), text)
+
+
+class StreamingSplitTests(SimpleTestCase):
+    def setUp(self):
+        self.pages = stub_paper_text("2401.00001v1", 80)
+        self.pages[3] = ""
+        self.full_text = PAGE_SEPARATOR.join(self.pages)
+
+    def test_streamed_chunks_match_splitting_the_whole_text(self):
+        self.assertGreater(len(self.full_text), 2 * STREAM_SPLIT_WINDOW)
+        self.assertEqual(list(iter_chunks(iter(self.pages))), split_text(self.full_text))
+
+    def test_text_prefix_matches_the_joined_text(self):
+        for limit in (1, 100, len(self.pages[0]) + 1, STREAM_SPLIT_WINDOW, len(self.full_text) + 10):
+            self.assertEqual(text_prefix(iter(self.pages), limit), self.full_text[:limit])
+
+    def test_text_length_of_cached_pages(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pages = PageTextCache(cache_dir=directory)
+            pages.store("ab" * 32, iter(self.pages))
+            self.assertEqual(pages.text_length("ab" * 32), len(self.full_text))
+            self.assertIsNone(pages.text_length("cd" * 32))
+
+
+class NearDuplicateEmbeddingTests(SimpleTestCase):
+    def test_borrowed_vectors_are_not_cached(self):
+        text = " ".join(f"word{i}" for i in range(200))
+        near_duplicate = text.replace("word100 ", "word100b ")
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = EmbeddingCache(db_path=f"{directory}/embeddings.sqlite3")
+            embeddings = CachedEmbeddings(
+                FakeEmbeddings(dim=8), "fake", cache=store,
+                near_duplicates=NearDuplicateIndex(0.8))
+            original, = embeddings.embed_documents([text])
+            borrowed, = embeddings.embed_documents([near_duplicate])
+
+            self.assertEqual(borrowed, original)
+            self.assertEqual(embeddings.stats["near_duplicates"], 1)
+            self.assertEqual(store.get_many([store.make_key(near_duplicate, "fake")]), {})
+
+            # Without dedup the chunk gets its own vector
+            with mock.patch('output.embedding_cache.DEDUP_ENABLED', False):
+                exact = CachedEmbeddings(FakeEmbeddings(dim=8), "fake", cache=store)
+            own, = exact.embed_documents([near_duplicate])
+            self.assertNotEqual(own, original)
+
+
+class StoredPayloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.client = client_for(self.user)
+        self.run = save_search_run("rag", make_outcome(), user_id=self.user.id)
+
+    def test_replay_sends_precompressed_body_with_etag(self):
+        response = self.client.get(
+            reverse('replay_run', args=[self.run.id]), HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], f'"{self.run.payload_hash}-gzip"')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(data["run_id"], self.run.id)
+        self.assertEqual(len(data["metadata_list"]), 2)
+
+    def test_replay_answers_matching_etag_with_304(self):
+        etag = self.client.get(reverse('replay_run', args=[self.run.id]))['ETag']
+
+        response = self.client.get(
+            reverse('replay_run', args=[self.run.id]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_replay_identity_body_without_accept_encoding(self):
+        response = self.client.get(reverse('replay_run', args=[self.run.id]))
+
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['ETag'], f'"{self.run.payload_hash}"')
+        self.assertEqual(json.loads(response.content)["query"], "rag")
+
+    def test_replay_of_another_users_run_is_not_found(self):
+        other = client_for(make_user('bob@example.com'))
+        response = other.get(reverse('replay_run', args=[self.run.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_finished_job_is_served_with_etag_and_304(self):
+        job = SearchJob.objects.create(
+            query="rag", user=self.user, run=self.run, status=SearchJob.STATUS_SUCCEEDED,
+            stage="done", finished_at=timezone.now())
+        store_payload(job, serialize_job(job))
+        url = reverse('search_job_status', args=[job.id])
+
+        response = APIClient().get(url, HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(data["status"], "succeeded")
+        self.assertEqual(data["result"]["run_id"], self.run.id)
+
+        not_modified = APIClient().get(
+            url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_running_job_is_not_cached(self):
+        job = SearchJob.objects.create(query="rag", status=SearchJob.STATUS_RUNNING)
+        response = APIClient().get(reverse('search_job_status', args=[job.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertEqual(response.data["status"], "running")
+
+
+class SearchHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.client = client_for(self.user)
+        self.runs = [save_search_run(f"query {i}", make_outcome(1), user_id=self.user.id)
+                     for i in range(5)]
+        # Two runs at the same instant must still page without gaps or repeats
+        SearchRun.objects.filter(id__in=[self.runs[1].id, self.runs[2].id]).update(
+            created_at=self.runs[1].created_at)
+        save_search_run("someone else's", make_outcome(1),
+                        user_id=make_user('bob@example.com').id)
+        save_search_run("anonymous", make_outcome(1))
+
+    def test_pages_cover_the_users_runs_newest_first(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get(reverse('search_history'), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(entry['run_id'] for entry in response.data['results'])
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+
+        expected = list(SearchRun.objects.filter(user=self.user)
+                        .order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 5)
+
+    def test_page_is_a_fixed_number_of_queries(self):
+        first = self.client.get(reverse('search_history'), {'limit': 2})
+        # Authentication is cached by now, so the page itself is one query
+        with self.assertNumQueries(1):
+            self.client.get(
+                reverse('search_history'), {'limit': 2, 'cursor': first.data['next_cursor']})
+
+    def test_invalid_cursor_and_limit_are_rejected(self):
+        for params in ({'cursor': 'not-a-cursor'}, {'limit': 0}, {'limit': 'x'}):
+            response = self.client.get(reverse('search_history'), params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_history_requires_login(self):
+        response = APIClient().get(reverse('search_history'))
+        self.assertEqual(response.status_code, 401)
+
+
+class MetadataIndexTests(TestCase):
+    def test_lookups_by_id_run_and_recency(self):
+        run = save_search_run("rag", make_outcome(2))
+        first, second = make_outcome(2)["papers"]
+        save_metadata(first)
+
+        self.assertEqual(get_metadata(first["arxiv_id"])["title"], first["title"])
+        self.assertIsNone(get_metadata("0000.00000v1"))
+        self.assertEqual([paper["arxiv_id"] for paper in run_metadata(run.id)],
+                         [first["arxiv_id"], second["arxiv_id"]])
+        # Saving a paper again makes it the most recently seen
+        self.assertEqual([paper["arxiv_id"] for paper in recent_metadata(2)],
+                         [first["arxiv_id"], second["arxiv_id"]])
+
+    def test_legacy_json_metadata_is_imported(self):
+        migration = importlib.import_module('output.migrations.0008_import_legacy_metadata')
+        paper = make_outcome(1)["papers"][0]
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, 'metadata'))
+            with open(os.path.join(directory, 'metadata', 'paper.json'), 'w') as f:
+                json.dump(paper, f)
+            with mock.patch('output.utils.data_root', directory):
+                migration.import_legacy_metadata(django_apps, None)
+
+        self.assertEqual(get_metadata(paper["arxiv_id"])["title"], paper["title"])
+
+
+class AskQuestionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user()
+        self.run = save_search_run("rag", make_outcome(1), user_id=self.owner.id)
+
+    def ask(self, client, run):
+        return client.post(
+            reverse('ask_question'), {'question': 'What?', 'run_id': run.id}, format='json')
+
+    def test_other_users_runs_are_not_found(self):
+        self.assertEqual(self.ask(APIClient(), self.run).status_code, 404)
+        other = client_for(make_user('bob@example.com'))
+        self.assertEqual(self.ask(other, self.run).status_code, 404)
+
+    def test_logged_in_users_cannot_use_anonymous_runs(self):
+        anonymous_run = save_search_run("rag", make_outcome(1))
+        response = self.ask(client_for(self.owner), anonymous_run)
+        self.assertEqual(response.status_code, 404)
+
+
+class RetrieverCacheTests(SimpleTestCase):
+    def test_concurrent_requests_load_a_paper_once(self):
+        retrievers = RetrieverCache(max_entries=4)
+        loads = []
+
+        def load(arxiv_id):
+            loads.append(arxiv_id)
+            time.sleep(0.05)
+            return object()
+
+        results = []
+        with mock.patch.object(retrievers, '_load', load), \
+                mock.patch.object(retrievers, '_manifest_mtime', lambda arxiv_id: 1):
+            threads = [threading.Thread(target=lambda: results.append(retrievers.get("2401.00001v1")))
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(loads, ["2401.00001v1"])
+        self.assertEqual(len({id(store) for store in results}), 1)
+        self.assertEqual(retrievers._loading, {})
+
+
+class RecordingExecutor:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args[0])
+
+
+class JobResumeTests(TestCase):
+    def make_job(self, status, age=0, **fields):
+        job = SearchJob.objects.create(query="rag", status=status, **fields)
+        SearchJob.objects.filter(id=job.id).update(
+            updated_at=timezone.now() - timedelta(seconds=age))
+        return job
+
+    def test_pending_and_stale_jobs_are_requeued(self):
+        stale_after = settings.SEARCH_JOB_STALE_AFTER
+        pending = self.make_job(SearchJob.STATUS_PENDING)
+        stale = self.make_job(SearchJob.STATUS_RUNNING, age=stale_after + 60)
+        alive = self.make_job(SearchJob.STATUS_RUNNING, age=stale_after - 60)
+        self.make_job(SearchJob.STATUS_SUCCEEDED, age=stale_after + 60)
+
+        executor = RecordingExecutor()
+        resume_interrupted_jobs(executor)
+
+        self.assertCountEqual(executor.submitted, [pending.id, stale.id])
+        alive.refresh_from_db()
+        self.assertEqual(alive.status, SearchJob.STATUS_RUNNING)
+
+    def test_heartbeat_only_refreshes_the_lease_holder(self):
+        job = self.make_job(SearchJob.STATUS_RUNNING, age=600, lease="a" * 32)
+
+        self.assertFalse(touch_job(job.id, "b" * 32))
+        self.assertTrue(touch_job(job.id, "a" * 32))
+        job.refresh_from_db()
+        self.assertLess(timezone.now() - job.updated_at, timedelta(seconds=60))
+
+    @override_settings(SEARCH_JOB_RESUME_ON_START=False)
+    def test_resume_only_in_server_processes(self):
+        self.assertFalse(should_resume_on_start(['manage.py', 'migrate']))
+        self.assertFalse(should_resume_on_start(['manage.py', 'test']))
+        self.assertFalse(should_resume_on_start(['django-admin', 'migrate']))
+        self.assertFalse(should_resume_on_start(['python', '-c', 'import django; django.setup()']))
+        self.assertFalse(should_resume_on_start(['gunicorn', 'backend.wsgi']))
+        self.assertTrue(should_resume_on_start(['manage.py', 'runserver', '--noreload']))
+
+    @override_settings(SEARCH_JOB_RESUME_ON_START=True)
+    def test_servers_opt_in_to_resume(self):
+        self.assertTrue(should_resume_on_start(['gunicorn', 'backend.wsgi']))
+
+
+class JobRunTests(TransactionTestCase):
+    """run_search_job manages its own connections and transactions"""
+
+    def make_job(self):
+        return SearchJob.objects.create(query="rag")
+
+    def test_result_of_a_job_taken_over_is_dropped(self):
+        job = self.make_job()
+
+        def scrapping(query, on_event=None):
+            # Another worker requeues and claims the job meanwhile
+            SearchJob.objects.filter(id=job.id).update(lease="b" * 32)
+            return make_outcome(1)
+
+        with mock.patch('output.scraper.Scrapping', scrapping):
+            run_search_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, SearchJob.STATUS_RUNNING)
+        self.assertIsNone(job.run_id)
+        self.assertFalse(SearchRun.objects.exists())
+
+    def test_job_runs_and_stores_its_result(self):
+        job = self.make_job()
+
+        with mock.patch('output.scraper.Scrapping', lambda query, on_event=None: make_outcome(1)):
+            run_search_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, SearchJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.attempts, 1)
+        self.assertTrue(job.payload_hash)
+
+
+def finished_job(query, listener=None, user=None):
+    listener("papers", {"papers": []})
+    listener("done", {"run_id": 1})
+    return SimpleNamespace(id=7)
+
+
+@mock.patch('output.views.submit_search_job', finished_job)
+class SearchStreamTests(SimpleTestCase):
+    expected = ['job', 'papers', 'done']
+
+    def event_names(self, chunks):
+        return [line.split(": ", 1)[1] for chunk in chunks
+                for line in chunk.decode().splitlines() if line.startswith("event: ")]
+
+    def test_wsgi_streams_a_sync_iterator(self):
+        response = self.client.get(reverse('search_papers_stream'), {'query': 'rag'})
+        self.assertFalse(response.is_async)
+        self.assertEqual(self.event_names(response.streaming_content), self.expected)
+
+    async def test_asgi_streams_an_async_iterator(self):
+        response = await self.async_client.get(reverse('search_papers_stream'), {'query': 'rag'})
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(self.event_names(chunks), self.expected)
+
+
+class NearDuplicatePaperTests(SimpleTestCase):
+    def test_borrowed_summary_is_not_cached_for_the_copy(self):
+        with tempfile.TemporaryDirectory() as directory:
+            summaries = SummaryCache(cache_dir=directory)
+            processor = mock.Mock(cache=summaries, gateway=SimpleNamespace(model_key="fake"))
+            summaries.set("2401.00001v1", "original", "fake", SUMMARY_PROMPT_HASH, {"overview": "x"})
+
+            summary = MultiPDFProcessor._reuse_near_duplicate(
+                processor, ("2401.00001v1", "original"), "2401.00002v1", "copy", None)
+            self.assertEqual(summary, {"overview": "x"})
+            self.assertIsNone(summaries.get("2401.00002v1", "copy", "fake", SUMMARY_PROMPT_HASH))
+
+
+class CountingGateway:
+    """Notes that say whether any of their sources mention ``marker``"""
+
+    def __init__(self, marker):
+        self.marker = marker
+        self.prompts = []
+
+    def generate(self, prompt):
+        self.prompts.append(prompt)
+        return f"note {len(self.prompts)}" + (f" [{self.marker}]" if self.marker in prompt else "")
+
+
+class SynthesisTests(SimpleTestCase):
+    def leaf(self, i):
+        return sha256_text(f"paper {i}"), f"summary of paper {i}"
+
+    def test_groups_stay_within_bounds(self):
+        leaves = sorted(self.leaf(i) for i in range(200))
+        groups = group_nodes(leaves, 4)
+        self.assertEqual([node for group in groups for node in group], leaves)
+        self.assertTrue(all(2 <= len(group) <= 8 for group in groups))
+
+    def test_new_leaf_regenerates_only_its_path_to_the_root(self):
+        leaves = sorted(self.leaf(i) for i in range(40))
+        added = self.leaf(40)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SynthesisCache(db_path=os.path.join(directory, "syntheses.sqlite3"))
+            gateway = CountingGateway(added[1])
+            synthesizer = Synthesizer(gateway, "fake", cache=cache, fan_in=4)
+
+            synthesizer.synthesize(leaves)
+            first_run = len(gateway.prompts)
+            synthesizer.synthesize(sorted(leaves + [added]))
+            regenerated = gateway.prompts[first_run:]
+
+        # 40 leaves make two levels of notes under the overall summary
+        self.assertGreater(first_run, 10)
+        self.assertEqual(len(regenerated), 3)
+        # Each regenerated node has the new paper below it
+        self.assertTrue(all(added[1] in prompt for prompt in regenerated))
+
+
+class ApiKeyTests(SimpleTestCase):
+    def test_missing_key_fails_clearly(self):
+        with mock.patch('output.providers.GOOGLE_API_KEY', None):
+            with self.assertRaisesMessage(ImproperlyConfigured, "GOOGLE_API_KEY is not set"):
+                google_api_key()
+        with mock.patch('output.providers.GOOGLE_API_KEY', "key"):
+            self.assertEqual(google_api_key(), "key")
+
+
+class ModelKeyTests(SimpleTestCase):
+    def test_fake_output_is_cached_apart_from_the_real_models(self):
+        fake = LLMGateway(FakeBackend()).model_key
+        real = LLMGateway(GeminiBackend(pool_size=1)).model_key
+        self.assertEqual(real, TEXT_MODEL_NAME)
+        self.assertNotEqual(fake, real)
+
+        with tempfile.TemporaryDirectory() as directory:
+            summaries = SummaryCache(cache_dir=directory)
+            summaries.set("2401.00001v1", "hash", fake, "prompt", {"overview": "fake"})
+            self.assertIsNone(summaries.get("2401.00001v1", "hash", real, "prompt"))
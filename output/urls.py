@@ -1,7 +1,17 @@
 # urls.py
 from django.urls import path
-from .views import search_query
+from .views import (
+    ask_question, search_query, search_stream, job_status, metrics, replay_run, search_history,
+    stream_ticket,
+)
 
 urlpatterns = [
     path('search/', search_query, name='search_papers'),
+    path('search/stream/', search_stream, name='search_papers_stream'),
+    path('search/ticket/', stream_ticket, name='search_stream_ticket'),
+    path('jobs/<uuid:job_id>/', job_status, name='search_job_status'),
+    path('ask/', ask_question, name='ask_question'),
+    path('history/', search_history, name='search_history'),
+    path('history/<int:run_id>/', replay_run, name='replay_run'),
+    path('metrics/', metrics, name='metrics'),
 ]
@@ -0,0 +1,54 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+# Override to keep benchmarks and experiments out of the real data directory
+data_root = os.getenv("OUTPUT_DATA_DIR", os.path.join(base_dir, 'data'))
+cache_root = os.path.join(data_root, 'cache')
+
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sha256_text(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def atomic_write_bytes(path, data):
+    """Write to a temp file in the target directory, then rename over the target"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(tmp_fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_json(path, data):
+    atomic_write_bytes(path, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+
+def connect_sqlite(path):
+    """Open a SQLite database that several worker processes can share"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
@@ -1,39 +1,254 @@
-import os
+import asyncio
 import json
+import queue
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from .scraper import Scrapping
-from .research_model import get_recent_arxiv_metadata
+from user.authentication import (
+    AUTH_TICKET_MAX_AGE, CachedJWTAuthentication, get_ticket_user, make_ticket,
+)
+from .http_cache import payload_response
+from .history import InvalidCursor, history_page, serialize_history_entry
+from .jobs import JobQueueFull, serialize_job, submit_search_job
+from .metrics import registry
+from .models import SearchJob, SearchRun
+from .results import serialize_run
 
+STREAM_TICKET_PURPOSE = "search-stream"
 
-@api_view(['GET'])
+
+def search_user(request):
+    """The logged-in user whose history a search is saved to, if any"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    # Plain Django views do not run DRF authentication themselves
+    try:
+        authenticated = CachedJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return authenticated[0] if authenticated else None
+
+
+@api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
 def search_query(request):
-    query = request.GET.get('query', '')
+    if request.method == 'POST':
+        query = request.data.get('query', '')
+    else:
+        query = request.GET.get('query', '')
     if not query:
         return Response({"error": "Query parameter is required."}, status=400)
 
-    # Optional: Do something with the query
-    Scrapping(query)
-    # print(f"Looking for summary file for query:")
-    # Define the path to the summary JSON
-    summary_path = "all_pdf_summaries.json"
-    print(f"Looking for summary file at: {summary_path}")
-
-    if not os.path.exists(summary_path):
-        return Response({"error": "Summary file not found."}, status=404)
-
-    with open(summary_path, 'r', encoding='utf-8') as f:
-        summary_data = json.load(f)
-
-    # shutil.rmtree(".\output\data")
-    metadata_List = get_recent_arxiv_metadata("output\data\metadata", 3)
-
-    return Response(
-        {
-            "summary_data": summary_data,
-            "metadata_list": metadata_List
-        },
-        status=200
-    )
+    try:
+        job = submit_search_job(query, user=search_user(request))
+    except JobQueueFull as e:
+        return Response({"error": str(e)}, status=503)
+
+    data = serialize_job(job)
+    data["status_url"] = request.build_absolute_uri(
+        reverse('search_job_status', args=[job.id]))
+    return Response(data, status=202)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def stream_ticket(request):
+    """A ticket that links a streamed search to the user.
+
+    EventSource cannot send an Authorization header, so the dashboard asks
+    for a ticket first and passes it as ``ticket`` to ``search/stream/``.
+    """
+    return Response({
+        "ticket": make_ticket(request.user, STREAM_TICKET_PURPOSE),
+        "expires_in": AUTH_TICKET_MAX_AGE,
+    }, status=200)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def job_status(request, job_id):
+    """A job's progress; once it succeeded, its stored response with an ETag"""
+    response = payload_response(
+        request, SearchJob.objects.filter(id=job_id, status=SearchJob.STATUS_SUCCEEDED),
+        serialize_job)
+    if response is not None:
+        return response
+
+    try:
+        job = SearchJob.objects.select_related('run').get(id=job_id)
+    except SearchJob.DoesNotExist:
+        return Response({"error": "Job not found."}, status=404)
+
+    return Response(serialize_job(job), status=200)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def ask_question(request):
+    """Answer a follow-up question from papers that were already ingested.
+
+    Takes ``question`` and either ``arxiv_ids`` or the ``run_id`` of an
+    earlier search, whose papers are then used. Runs of logged-in users are
+    only visible to them; anonymous callers can only use anonymous runs.
+    """
+    from .llm_gateway import LLMError
+    from .qa import QA_MAX_PAPERS, PaperNotIngested, answer_question
+
+    question = (request.data.get('question') or '').strip()
+    if not question:
+        return Response({"error": "Question is required."}, status=400)
+
+    run_id = request.data.get('run_id')
+    if run_id is not None:
+        try:
+            owner = request.user if request.user.is_authenticated else None
+            run = SearchRun.objects.only('id').get(id=run_id, user=owner)
+        except (SearchRun.DoesNotExist, ValueError):
+            return Response({"error": "Search run not found."}, status=404)
+        arxiv_ids = list(run.summaries.order_by('position')
+                         .values_list('paper__arxiv_id', flat=True))
+    else:
+        arxiv_ids = request.data.get('arxiv_ids') or []
+        if not isinstance(arxiv_ids, list) or not all(isinstance(i, str) for i in arxiv_ids):
+            return Response({"error": "arxiv_ids must be a list of arXiv ids."}, status=400)
+    if not arxiv_ids:
+        return Response({"error": "No papers to answer from."}, status=400)
+    if len(arxiv_ids) > QA_MAX_PAPERS:
+        return Response(
+            {"error": f"At most {QA_MAX_PAPERS} papers can be queried at once."}, status=400)
+
+    try:
+        return Response(answer_question(question, arxiv_ids), status=200)
+    except PaperNotIngested as e:
+        return Response({"error": f"Paper {e} has not been ingested yet."}, status=404)
+    except LLMError as e:
+        return Response({"error": f"Answer generation failed: {e}"}, status=502)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_history(request):
+    """The user's past searches, newest first.
+
+    Pass the returned ``next_cursor`` as ``cursor`` for the next page;
+    ``limit`` sets the page size.
+    """
+    limit = request.GET.get('limit') or None
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            return Response({"error": "limit must be a number."}, status=400)
+        if limit < 1:
+            return Response({"error": "limit must be at least 1."}, status=400)
+
+    try:
+        runs, next_cursor = history_page(
+            request.user, cursor=request.GET.get('cursor'), limit=limit)
+    except InvalidCursor:
+        return Response({"error": "Invalid cursor."}, status=400)
+
+    return Response({
+        "results": [serialize_history_entry(run) for run in runs],
+        "next_cursor": next_cursor,
+    }, status=200)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def replay_run(request, run_id):
+    """A past search's stored results, without searching or summarizing again.
+
+    The body is sent precompressed with an ETag, so a repeat view can be
+    answered with 304 Not Modified.
+    """
+    response = payload_response(
+        request, SearchRun.objects.filter(id=run_id, user=request.user), serialize_run)
+    if response is None:
+        return Response({"error": "Search run not found."}, status=404)
+    return response
+
+
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+@require_GET
+def search_stream(request):
+    """Run a search job and stream its events as server-sent events.
+
+    Clients get the arXiv metadata first (``papers``), then every summary
+    section as it is finalized (``section``), then ``overall_summary`` and
+    finally ``done`` or ``error``. Progress events are passed through too.
+    The job keeps running and is persisted if the client disconnects.
+    A ``ticket`` from ``search/ticket/`` saves the search to the user's history.
+    """
+    query = request.GET.get('query', '')
+    if not query:
+        return JsonResponse({"error": "Query parameter is required."}, status=400)
+
+    ticket = request.GET.get('ticket')
+    if ticket:
+        try:
+            user = get_ticket_user(ticket, STREAM_TICKET_PURPOSE)
+        except AuthenticationFailed as e:
+            return JsonResponse({"error": str(e.detail)}, status=401)
+    else:
+        user = search_user(request)
+
+    events = queue.Queue()
+    try:
+        job = submit_search_job(
+            query, listener=lambda stage, data: events.put((stage, data)), user=user)
+    except JobQueueFull as e:
+        return JsonResponse({"error": str(e)}, status=503)
+
+    def event_stream():
+        yield format_sse("job", {"job_id": str(job.id)})
+        while True:
+            try:
+                stage, data = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(stage, data)
+            if stage in ("done", "error"):
+                break
+
+    async def async_event_stream():
+        yield format_sse("job", {"job_id": str(job.id)})
+        while True:
+            try:
+                stage, data = await asyncio.to_thread(
+                    events.get, timeout=SSE_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(stage, data)
+            if stage in ("done", "error"):
+                break
+
+    # Django buffers a sync iterator completely under ASGI and an async one
+    # completely under WSGI, so each server gets its own kind of generator
+    stream = async_event_stream() if isinstance(request, ASGIRequest) else event_stream()
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+def metrics(request):
+    """Pipeline metrics for this process in the Prometheus text format"""
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
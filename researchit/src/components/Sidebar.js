@@ -9,7 +9,8 @@ const Sidebar = ({
   conversations,
   activeConversationId,
   selectConversation,
-  createNewConversation
+  createNewConversation,
+  loadMoreHistory
 }) => {
   const navigate = useNavigate();
   const [userData, setUserData] = useState(null);
@@ -112,12 +113,20 @@ const Sidebar = ({
               <div className="ml-3 truncate">
                 <p className="font-medium text-gray-800 truncate">{conversation.title}</p>
                 <p className="text-xs text-gray-500 truncate">
-                  {conversation.messages.find(m => m.sender === 'user')?.text || 'New conversation'}
+                  {conversation.subtitle || conversation.messages.find(m => m.sender === 'user')?.text || 'New conversation'}
                 </p>
               </div>
             )}
           </div>
         ))}
+        {loadMoreHistory && !isCollapsed && (
+          <button
+            onClick={loadMoreHistory}
+            className="w-full p-2 text-sm text-[#D65600] hover:underline"
+          >
+            Load older searches
+          </button>
+        )}
       </div>
 
       {!isLoggedIn() ? (
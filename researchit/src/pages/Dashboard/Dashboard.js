@@ -18,13 +18,74 @@ const Dashboard = () => {
   const messagesEndRef = useRef(null);
   const timeoutRef = useRef(null);
 
-  // Initialize with a new conversation
+  const [historyCursor, setHistoryCursor] = useState(null);
+
+  // Initialize with a new conversation, followed by past searches
   useEffect(() => {
     if (conversations.length === 0) {
       createNewConversation();
     }
+    if (localStorage.getItem('accessToken')) {
+      loadHistory();
+    }
   }, []);
 
+  const authHeaders = () => ({
+    'Authorization': `Bearer ${localStorage.getItem('accessToken')}`,
+  });
+
+  // Past searches become conversations whose messages load when opened
+  const loadHistory = async (cursor = null) => {
+    try {
+      const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`http://127.0.0.1:8000/output/history/${params}`, {
+        headers: authHeaders(),
+      });
+      if (!response.ok) return;
+      const data = await response.json();
+      setConversations(prev => [
+        ...prev,
+        ...data.results.map(run => ({
+          id: `run-${run.run_id}`,
+          runId: run.run_id,
+          title: run.query,
+          createdAt: run.created_at,
+          subtitle: new Date(run.created_at).toLocaleString(),
+          messages: []
+        }))
+      ]);
+      setHistoryCursor(data.next_cursor);
+    } catch (error) {
+      console.error('Failed to load search history:', error);
+    }
+  };
+
+  // Stored results of a past search; nothing is searched or summarized again
+  const replayRun = async (conversation) => {
+    const response = await fetch(`http://127.0.0.1:8000/output/history/${conversation.runId}/`, {
+      headers: authHeaders(),
+    });
+    if (!response.ok) {
+      throw new Error('Failed to load the past search');
+    }
+    const data = await response.json();
+    return [
+      {
+        id: 1,
+        text: data.query,
+        sender: 'user',
+        timestamp: new Date(conversation.createdAt)
+      },
+      {
+        id: 2,
+        text: "Here are all available papers with their citations:",
+        sender: 'bot',
+        timestamp: new Date(conversation.createdAt),
+        citations: generateAllCitations(data.metadata_list || [], data.summary_data || {})
+      }
+    ];
+  };
+
   // Scroll to bottom of messages
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -90,8 +151,7 @@ const Dashboard = () => {
   const generateAllCitations = (metadataList, summaryData) => {
     return metadataList.map(metadata => {
       // Find matching summary data if it exists
-      const summaryKey = `output\\data\\pdf\\${metadata.arxiv_id}.pdf`;
-      const summary = summaryData[summaryKey] || null;
+      const summary = summaryData[metadata.arxiv_id] || null;
       
       return {
         id: metadata.arxiv_id,
@@ -108,6 +168,62 @@ const Dashboard = () => {
     });
   };
 
+  // EventSource cannot send the Authorization header, so logged-in searches
+  // pass a short-lived ticket instead to be saved to the user's history
+  const streamTicket = async () => {
+    if (!localStorage.getItem('accessToken')) return null;
+    try {
+      const response = await fetch('http://127.0.0.1:8000/output/search/ticket/', {
+        method: 'POST',
+        headers: authHeaders(),
+      });
+      return response.ok ? (await response.json()).ticket : null;
+    } catch (error) {
+      console.error('Failed to get a stream ticket:', error);
+      return null;
+    }
+  };
+
+  // Stream a search, calling onUpdate with partial results as they arrive
+  const streamSearch = async (query, onUpdate) => {
+    const ticket = await streamTicket();
+    const ticketParam = ticket ? `&ticket=${encodeURIComponent(ticket)}` : '';
+    return openSearchStream(
+      `http://127.0.0.1:8000/output/search/stream/?query=${encodeURIComponent(query)}${ticketParam}`,
+      onUpdate
+    );
+  };
+
+  const openSearchStream = (url, onUpdate) => new Promise((resolve, reject) => {
+    const source = new EventSource(url);
+    const result = { metadata_list: [], summary_data: {}, overall_summary: '' };
+
+    source.addEventListener('papers', (event) => {
+      result.metadata_list = JSON.parse(event.data).papers;
+      onUpdate({ ...result });
+    });
+    source.addEventListener('section', (event) => {
+      const { arxiv_id, section, content } = JSON.parse(event.data);
+      result.summary_data = {
+        ...result.summary_data,
+        [arxiv_id]: { ...(result.summary_data[arxiv_id] || {}), [section]: content }
+      };
+      onUpdate({ ...result });
+    });
+    source.addEventListener('overall_summary', (event) => {
+      result.overall_summary = JSON.parse(event.data).content;
+      onUpdate({ ...result });
+    });
+    source.addEventListener('done', () => {
+      source.close();
+      resolve(result);
+    });
+    source.addEventListener('error', (event) => {
+      source.close();
+      reject(new Error(event.data ? JSON.parse(event.data).error : 'Failed to fetch research papers'));
+    });
+  });
+
   const searchResearchPapers = async (query) => {
     if (!query.trim()) return;
     
@@ -155,17 +271,22 @@ const Dashboard = () => {
     }, 20000);
 
     try {
-      const response = await fetch(`http://127.0.0.1:8000/output/search/?query=${encodeURIComponent(query)}`);
-      
+      const responseData = await streamSearch(query, (partial) => {
+        // Show papers and sections as soon as they are produced
+        clearTimeout(timeoutRef.current);
+        const partialMessage = {
+          id: loadingMessageId,
+          text: "Here are all available papers with their citations:",
+          sender: 'bot',
+          timestamp: new Date(),
+          citations: generateAllCitations(partial.metadata_list, partial.summary_data)
+        };
+        setCurrentConversation(prev => prev.map(m => m.id === loadingMessageId ? partialMessage : m));
+      });
+
       // Clear the timeout if request completes
       clearTimeout(timeoutRef.current);
       
-      if (!response.ok) {
-        throw new Error('Failed to fetch research papers');
-      }
-
-      const responseData = await response.json();
-      
       // Generate citations for all papers in metadata
       const allCitations = generateAllCitations(responseData.metadata_list || [], responseData.summary_data || {});
 
@@ -249,13 +370,25 @@ const Dashboard = () => {
     ));
   };
 
-  const selectConversation = (conversationId) => {
+  const selectConversation = async (conversationId) => {
     const conversation = conversations.find(c => c.id === conversationId);
-    if (conversation) {
-      setCurrentConversation(conversation.messages);
-      setActiveConversationId(conversationId);
-      setShowTermPanel(false);
+    if (!conversation) return;
+    setActiveConversationId(conversationId);
+    setShowTermPanel(false);
+    if (conversation.runId && conversation.messages.length === 0) {
+      try {
+        const messages = await replayRun(conversation);
+        setConversations(prev => prev.map(conv =>
+          conv.id === conversationId ? { ...conv, messages } : conv
+        ));
+        setCurrentConversation(messages);
+      } catch (error) {
+        console.error('Replay error:', error);
+        toast.error("Couldn't load this search. Please try again.");
+      }
+      return;
     }
+    setCurrentConversation(conversation.messages);
   };
 
   const handleNewChat = () => {
@@ -416,6 +549,7 @@ const Dashboard = () => {
         activeConversationId={activeConversationId}
         selectConversation={selectConversation}
         createNewConversation={handleNewChat}
+        loadMoreHistory={historyCursor ? () => loadHistory(historyCursor) : null}
       />
 
       <div className={`flex-1 flex flex-col transition-all duration-300 ${
@@ -0,0 +1,102 @@
+"""JWT authentication that resolves users from a cache instead of the database.
+
+Tokens carry the user's ``token_version``. The user behind a token is cached
+under its id and that version, so a request costs no query once the user has
+been seen. Changing the password bumps the version, which revokes every
+token issued before; saving the user drops its cache entry. Entries also
+expire after ``AUTH_USER_CACHE_TTL`` seconds, which bounds how stale a
+per-process cache can get on other workers.
+"""
+import os
+
+from django.core import signing
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from output.metrics import record_cache, timed
+
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "300"))
+# Tickets stand in for a token where a client cannot send headers (EventSource)
+AUTH_TICKET_MAX_AGE = int(os.getenv("AUTH_TICKET_MAX_AGE", "60"))
+TOKEN_VERSION_CLAIM = "token_version"
+# Enough to authenticate and authorize; anything else is loaded on access
+CACHED_USER_FIELDS = ("id", "email", "fullname", "is_active", "is_staff", "is_superuser",
+                      "token_version")
+
+
+def user_cache_key(user_id, token_version):
+    return f"auth-user:{user_id}:{token_version}"
+
+
+def forget_user(user_id, *token_versions):
+    cache.delete_many([user_cache_key(user_id, version) for version in token_versions])
+
+
+class UserRefreshToken(RefreshToken):
+    """Refresh token that, like its access tokens, carries the user's token version"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+def get_token_user(token):
+    """The active user ``token`` was issued to, failing if it has been revoked"""
+    from .models import User
+
+    try:
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+    # Tokens issued before versions existed match users that never changed password
+    token_version = token.get(TOKEN_VERSION_CLAIM, 0)
+
+    key = user_cache_key(user_id, token_version)
+    values = cache.get(key)
+    record_cache("auth_user", values is not None)
+    # from_db takes values in the model's field order, whatever the names' order
+    field_names = [field.attname for field in User._meta.concrete_fields
+                   if field.attname in CACHED_USER_FIELDS]
+    if values is not None:
+        user = User.from_db(router.db_for_read(User), field_names, values)
+    else:
+        try:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if user.token_version != token_version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        cache.set(key, [getattr(user, name) for name in field_names], AUTH_USER_CACHE_TTL)
+
+    if not api_settings.USER_AUTHENTICATION_RULE(user):
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return user
+
+
+def make_ticket(user, purpose):
+    """A short-lived signed ticket for ``user``, only valid for ``purpose``"""
+    return signing.dumps(
+        {api_settings.USER_ID_CLAIM: user.pk, TOKEN_VERSION_CLAIM: user.token_version},
+        salt=f"auth-ticket:{purpose}")
+
+
+def get_ticket_user(ticket, purpose):
+    """The user a ticket was made for; revoked along with the user's tokens"""
+    try:
+        claims = signing.loads(ticket, salt=f"auth-ticket:{purpose}", max_age=AUTH_TICKET_MAX_AGE)
+    except signing.BadSignature:
+        raise AuthenticationFailed(_("Ticket is invalid or expired"), code="ticket_invalid")
+    return get_token_user(claims)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        with timed("authenticate"):
+            return get_token_user(validated_token)
@@ -29,6 +29,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     fullname = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Bumped on password changes; tokens carrying an older version are rejected
+    token_version = models.PositiveIntegerField(default=0)
 
     objects = CustomUserManager()
 
@@ -38,6 +40,30 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+    def change_password(self, raw_password):
+        """Set a new password and revoke every token issued before it"""
+        self.set_password(raw_password)
+        self._revoked_token_version = self.token_version
+        self.token_version += 1
+        self.save(update_fields=['password', 'token_version'])
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._forget_cached()
+
+    def delete(self, *args, **kwargs):
+        self._forget_cached()
+        return super().delete(*args, **kwargs)
+
+    def _forget_cached(self):
+        from .authentication import forget_user
+
+        versions = [self.token_version]
+        revoked = self.__dict__.pop('_revoked_token_version', None)
+        if revoked is not None:
+            versions.append(revoked)
+        forget_user(self.pk, *versions)
+
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
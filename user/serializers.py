@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from user.authentication import UserRefreshToken, get_token_user
 from user.models import User
 
 
@@ -38,3 +40,27 @@ class UserLoginSerializer(serializers.Serializer):
 
         data['user'] = user
         return data
+
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = UserRefreshToken
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = UserRefreshToken
+
+    def validate(self, attrs):
+        # Refresh tokens revoked by a password change are rejected before
+        # simplejwt issues anything (or rotates and blacklists)
+        get_token_user(self.token_class(attrs['refresh']))
+        return super().validate(attrs)
+
+
+class PasswordChangeSerializer(serializers.Serializer):
+    old_password = serializers.CharField(write_only=True)
+    new_password = serializers.CharField(write_only=True, min_length=6)
+
+    def validate_old_password(self, value):
+        if not self.context['user'].check_password(value):
+            raise serializers.ValidationError('Current password is incorrect')
+        return value
@@ -1,3 +1,136 @@
-from django.test import TestCase
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .authentication import UserRefreshToken, get_ticket_user, get_token_user
+from .models import User
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='ada@example.com', fullname='Ada Lovelace', password='secret-1')
+        self.client = APIClient()
+
+    def login(self, password='secret-1'):
+        response = self.client.post(
+            reverse('login'), {'email': 'ada@example.com', 'password': password}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def authorize(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_profile_is_served_from_the_cache_after_the_first_request(self):
+        self.authorize(self.login()['access'])
+        first = self.client.get(reverse('profile'))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('profile'))
+
+        expected = {'id': self.user.id, 'email': 'ada@example.com', 'fullname': 'Ada Lovelace'}
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data, expected)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, expected)
+
+    def test_cached_user_keeps_its_fields(self):
+        admin = User.objects.create_superuser(
+            email='admin@example.com', fullname='Admin', password='secret-1')
+        token = UserRefreshToken.for_user(admin).access_token
+
+        for _ in range(2):
+            user = get_token_user(token)
+            self.assertEqual(user.id, admin.id)
+            self.assertEqual(user.email, 'admin@example.com')
+            self.assertEqual(user.fullname, 'Admin')
+            self.assertIs(user.is_active, True)
+            self.assertIs(user.is_staff, True)
+            self.assertIs(user.is_superuser, True)
+
+    def test_saving_the_user_drops_its_cache_entry(self):
+        self.authorize(self.login()['access'])
+        self.client.get(reverse('profile'))
+        self.user.fullname = 'Augusta Ada King'
+        self.user.save()
+
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.data['fullname'], 'Augusta Ada King')
+
+    def test_password_change_revokes_earlier_tokens(self):
+        tokens = self.login()
+        self.authorize(tokens['access'])
+        self.client.get(reverse('profile'))
+
+        response = self.client.post(
+            reverse('change_password'),
+            {'old_password': 'secret-1', 'new_password': 'secret-2'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 401)
+        refreshed = self.client.post(
+            reverse('token_refresh'), {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(refreshed.status_code, 401)
+
+        self.authorize(response.data['access'])
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+
+    def test_refresh_issues_a_working_access_token(self):
+        tokens = self.login()
+        response = self.client.post(
+            reverse('token_refresh'), {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.authorize(response.data['access'])
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+
+    def test_password_hash_upgrade_keeps_tokens_valid(self):
+        hashers = ['django.contrib.auth.hashers.PBKDF2PasswordHasher',
+                   'django.contrib.auth.hashers.MD5PasswordHasher']
+        with override_settings(PASSWORD_HASHERS=hashers):
+            self.user.password = make_password('secret-1', hasher='md5')
+            self.user.save()
+            token = UserRefreshToken.for_user(self.user).access_token
+
+            # Logging in rehashes the password with the preferred hasher
+            self.login()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+        self.assertEqual(self.user.token_version, 0)
+        self.assertEqual(get_token_user(token).id, self.user.id)
+
+
+class StreamTicketTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='ada@example.com', fullname='Ada Lovelace', password='secret-1')
+        self.client = APIClient()
+        access = UserRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def ticket(self):
+        response = self.client.post(reverse('search_stream_ticket'))
+        self.assertEqual(response.status_code, 200)
+        return response.data['ticket']
+
+    def test_ticket_resolves_to_its_user(self):
+        self.assertEqual(get_ticket_user(self.ticket(), 'search-stream').id, self.user.id)
+
+    def test_ticket_is_bound_to_its_purpose(self):
+        with self.assertRaises(AuthenticationFailed):
+            get_ticket_user(self.ticket(), 'something-else')
+
+    def test_ticket_is_revoked_by_a_password_change(self):
+        ticket = self.ticket()
+        self.user.change_password('secret-2')
+        with self.assertRaises(AuthenticationFailed):
+            get_ticket_user(ticket, 'search-stream')
+
+    def test_stream_rejects_a_bad_ticket(self):
+        response = self.client.get(
+            reverse('search_papers_stream'), {'query': 'rag', 'ticket': 'forged'})
+        self.assertEqual(response.status_code, 401)
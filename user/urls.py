@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import register, login, profile
+from .views import register, login, profile, change_password
 
 urlpatterns = [
     path('register/', register, name='register'),
     path('login/', login, name='login'),
     path('profile/', profile, name='profile'),
+    path('password/', change_password, name='change_password'),
 ]
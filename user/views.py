@@ -3,8 +3,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.tokens import RefreshToken
-from .serializers import UserRegistrationSerializer, UserLoginSerializer
+from .authentication import UserRefreshToken
+from .serializers import PasswordChangeSerializer, UserRegistrationSerializer, UserLoginSerializer
 
 
 @api_view(['POST'])
@@ -30,7 +30,7 @@ def login(request):
     serializer = UserLoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         return Response({
             'message': 'Login successful',
             'access': str(refresh.access_token),
@@ -42,9 +42,27 @@ def login(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def profile(request):
+    # request.user comes from the authentication cache, so this makes no query
     user = request.user
     return Response({
         'id': user.id,
         'email': user.email,
         'fullname': user.fullname,
     }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def change_password(request):
+    """Change the password, revoking every token issued before, and log in again"""
+    serializer = PasswordChangeSerializer(data=request.data, context={'user': request.user})
+    if serializer.is_valid():
+        user = request.user
+        user.change_password(serializer.validated_data['new_password'])
+        refresh = UserRefreshToken.for_user(user)
+        return Response({
+            'message': 'Password changed successfully',
+            'access': str(refresh.access_token),
+            'refresh': str(refresh),
+        }, status=status.HTTP_200_OK)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)